@@ -1,5 +1,20 @@
 import json
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+READ_AHEAD = 4  # 最多同时预读的文件数，内存占用只与这几个文件有关
+
+def _read_checked(file_path):
+    """读取单个文件的原始字节并校验是否为合法 JSON，返回 (内容或 None, 错误信息或 None)"""
+    try:
+        with open(file_path, 'rb') as in_f:
+            content = in_f.read()
+        # 先按 UTF-8 严格解码：bytes 版 json.loads 会接受 BOM/UTF-16，这种字节不能直接拼进数组
+        json.loads(content.decode('utf-8'))
+        return content, None
+    except Exception as e:
+        return None, e
 
 def merge_specific_jsons(input_folder='output', output_folder='merged_output', target_indices=None):
     """
@@ -22,30 +37,24 @@ def merge_specific_jsons(input_folder='output', output_folder='merged_output', t
         os.makedirs(output_folder)
         print(f"已创建输出目录: {output_folder}")
 
-    merged_data = []
+    existing_files = []
     found_count = 0
 
     print(f"正在准备合并以下 Index 的文件: {target_indices}")
 
-    # 3. 遍历列表并读取文件
+    # 3. 遍历列表，确认需要合并的文件
     for idx in target_indices:
         # 构造文件名，需要匹配上一个脚本的命名规则 (例如 1 -> 01.json, 36 -> 36.json)
         file_name = f"{idx:02d}.json"
         file_path = os.path.join(input_folder, file_name)
 
         if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    merged_data.append(data)
-                    found_count += 1
-            except Exception as e:
-                print(f"读取文件 {file_name} 时出错: {e}")
+            existing_files.append((file_name, file_path))
         else:
             print(f"警告: 找不到文件 {file_name} (对应 index {idx})，已跳过。")
 
-    # 4. 如果没有找到任何数据，提前结束
-    if not merged_data:
+    # 4. 如果没有找到任何文件，提前结束
+    if not existing_files:
         print("未找到任何指定的文件，合并终止。")
         return
 
@@ -54,13 +63,39 @@ def merge_specific_jsons(input_folder='output', output_folder='merged_output', t
     output_filename = "_".join(str(i) for i in target_indices) + ".json"
     output_path = os.path.join(output_folder, output_filename)
 
-    # 6. 保存合并后的文件
+    # 6. 后台线程最多预读 READ_AHEAD 个文件并校验，主线程按输入顺序逐个写出；
+    #    每个文件本身就是一个 JSON 对象，校验通过后直接按字节用逗号拼接成数组，无需再序列化
     try:
-        # 为了保持结构清晰，通常将合并后的列表放在一个 "papers" 键下，或者直接存为一个列表
-        # 这里我选择直接存为一个包含多个对象的列表
-        with open(output_path, 'w', encoding='utf-8') as out_f:
-            json.dump(merged_data, out_f, ensure_ascii=False, indent=4)
-        
+        with ThreadPoolExecutor(max_workers=READ_AHEAD) as executor, open(output_path, 'wb') as out_f:
+            out_f.write(b"[\n")
+            window = deque()
+
+            def write_oldest():
+                nonlocal found_count
+                file_name, future = window.popleft()
+                content, error = future.result()
+                if error is not None:
+                    print(f"读取文件 {file_name} 时出错 (已跳过): {error}")
+                    return
+                if found_count:
+                    out_f.write(b",\n")
+                out_f.write(content)
+                found_count += 1
+
+            for file_name, file_path in existing_files:
+                if len(window) >= READ_AHEAD:
+                    write_oldest()
+                window.append((file_name, executor.submit(_read_checked, file_path)))
+            while window:
+                write_oldest()
+            out_f.write(b"\n]\n")
+
+        # 所有文件都没通过校验时不留下空数组
+        if not found_count:
+            os.remove(output_path)
+            print("未找到任何指定的文件，合并终止。")
+            return
+
         print(f"\n成功！")
         print(f"已合并 {found_count} 个文件。")
         print(f"结果已保存至: {output_path}")
@@ -6,14 +6,22 @@ Unified pipeline that covers:
 """
 import os
 import re
+import random
+import dbm
+import asyncio
+import hashlib
 import json
 import time
+import threading
 import concurrent.futures
 from dataclasses import dataclass, field
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Iterable, Optional
 
+import httpx
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from tqdm import tqdm
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -42,7 +50,10 @@ class PipelineRunConfig:
     abstract_dir_name: str = "abstracts"
     dblp_limit: int = 1000
     dblp_sleep: float = 0.5
-    abstract_sleep: float = 1.2
+    dblp_concurrency: int = 1  # DBLP 同时在途的请求数；大于 1 时实际请求速率约为 dblp_sleep 对应速率的同等倍数
+    abstract_sleep: float = 1.2  # Semantic Scholar 全局请求最小间隔 (秒)
+    abstract_workers: int = 4  # 摘要抓取并发线程数
+    artifact_format: str = "parquet"  # 中间结果格式: parquet / feather / xlsx
     resume: bool = True  # 允许复用已有中间结果
 
 
@@ -56,8 +67,11 @@ class AIConfig:
     batch_size: int = 5
     max_workers: int = 5
     timeout: int = 60
+    max_retries: int = 3
+    retry_base_delay: float = 0.5  # 429 无 Retry-After 时的指数退避起点 (秒)
     api_key_env: str = "DEEPSEEK_API_KEY"
     api_key: Optional[str] = None
+    ai_cache_path: Optional[str] = None  # 评分缓存 (dbm)，默认放在评分结果同目录下的 ai_cache
 
 
 # ---------------------------------------------------------------------------
@@ -68,26 +82,109 @@ def ensure_dir(path: str) -> str:
     return path
 
 
+class RateLimiter:
+    """线程安全的限速器：保证相邻两次放行至少间隔 interval 秒，只等待不足的部分"""
+
+    def __init__(self, interval: float):
+        self.interval = max(0.0, interval)
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _save_df(df: pd.DataFrame, base_path: str, fmt: str) -> str:
+    """按格式写出中间结果，返回带扩展名的完整路径"""
+    path = f"{base_path}.{fmt}"
+    if fmt == "parquet":
+        df.to_parquet(path, index=False, compression="zstd")
+    elif fmt == "feather":
+        df.reset_index(drop=True).to_feather(path)
+    elif fmt == "xlsx":
+        df.to_excel(path, index=False)
+    else:
+        raise ValueError(f"不支持的中间结果格式: {fmt}")
+    return path
+
+
+def _load_df(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    if path.endswith(".feather"):
+        return pd.read_feather(path)
+    return pd.read_excel(path, engine="calamine")
+
+
+STAGE_ARTIFACT_FORMATS = ("parquet", "feather", "xlsx")
+
+
+def _read_stage_artifact(base_path: str) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """读取某阶段已有的中间结果：多种格式并存时取最新的一份；旧版 xlsx 读取后顺手转存 parquet"""
+    candidates = [f"{base_path}.{fmt}" for fmt in STAGE_ARTIFACT_FORMATS if os.path.exists(f"{base_path}.{fmt}")]
+    if not candidates:
+        return None, None
+    path = max(candidates, key=os.path.getmtime)
+    df = _load_df(path)
+    if path.endswith(".xlsx"):
+        try:
+            path = _save_df(df, base_path, "parquet")
+        except Exception as exc:
+            print(f"[Cache] 转存 parquet 失败，继续使用 xlsx: {exc}")
+    return df, path
+
+
+# 显式声明压缩协商并标明客户端身份 (DBLP 建议爬取方设置可识别的 User-Agent)
+HTTP_HEADERS = {"Accept-Encoding": "gzip, deflate", "User-Agent": "get_pappers/1.0"}
+
+
+def build_http_session(pool_size: int = 10) -> requests.Session:
+    """带连接池与自动重试的 Session，复用 TCP/TLS 连接"""
+    retry = Retry(
+        total=3,
+        backoff_factor=1.0,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(HTTP_HEADERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# 未显式传入 session 时共用的默认连接池
+HTTP_SESSION = build_http_session()
+
+
+DOI_RE = re.compile(r"doi.org/(10\.\d{4,}/[-._;()/:a-zA-Z0-9]+)")
+
+
 def extract_doi(url: str) -> str:
     if not url:
         return ""
-    match = re.search(r"doi.org/(10\.\d{4,}/[-._;()/:a-zA-Z0-9]+)", url)
+    match = DOI_RE.search(url)
     return match.group(1) if match else ""
 
 
-def fetch_dblp_once(stream_key: str, keyword: str, start_year: int, limit: int) -> List[Dict]:
-    url = "https://dblp.org/search/publ/api"
-    query = f"stream:{stream_key}: {keyword}"
-    params = {"q": query, "format": "json", "h": limit}
+DBLP_API_URL = "https://dblp.org/search/publ/api"
+DBLP_MAX_RETRIES = 4  # 单个 DBLP 请求的最多尝试次数 (含首次)
+
+
+def _dblp_params(stream_key: str, keyword: str, limit: int) -> Dict:
+    return {"q": f"stream:{stream_key}: {keyword}", "format": "json", "h": limit}
 
-    try:
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-    except Exception as exc:
-        print(f"[DBLP] 请求失败 ({stream_key}, {keyword}): {exc}")
-        return []
 
+def _parse_dblp_hits(data: Dict, start_year: int) -> List[Dict]:
     hits = data.get("result", {}).get("hits", {}).get("hit", [])
     rows = []
     for hit in hits:
@@ -103,50 +200,171 @@ def fetch_dblp_once(stream_key: str, keyword: str, start_year: int, limit: int)
             authors_str = ", ".join([a.get("text", "") for a in authors_data])
 
         ee_url = info.get("ee", "")
+        venue = info.get("venue", "")
+        if isinstance(venue, list):
+            # 少数条目的 venue 是列表，拼成字符串以便存为 category
+            venue = ", ".join(venue)
         rows.append(
             {
                 "Year": year,
                 "Title": info.get("title", ""),
                 "Authors": authors_str,
-                "Venue": info.get("venue", ""),
-                "DOI": extract_doi(ee_url),
+                "Venue": venue,
                 "URL": ee_url,
             }
         )
     return rows
 
 
+def fetch_dblp_once(stream_key: str, keyword: str, start_year: int, limit: int) -> List[Dict]:
+    try:
+        response = HTTP_SESSION.get(DBLP_API_URL, params=_dblp_params(stream_key, keyword, limit), timeout=30)
+        response.raise_for_status()
+        # 直接解析原始字节，跳过 requests 的文本解码与编码探测
+        data = json.loads(response.content)
+    except Exception as exc:
+        print(f"[DBLP] 请求失败 ({stream_key}, {keyword}): {exc}")
+        return []
+    return _parse_dblp_hits(data, start_year)
+
+
+async def _fetch_dblp_once_async(
+    client: httpx.AsyncClient,
+    sem: asyncio.Semaphore,
+    stream_key: str,
+    keyword: str,
+    start_year: int,
+    limit: int,
+    sleep: float,
+) -> Optional[List[Dict]]:
+    """
+    单次 DBLP 查询；429/5xx 与网络错误按 Retry-After 或指数退避重试，最终失败返回 None
+    其他 4xx 属于查询本身的问题，重试也无用，告警后按无结果处理
+    """
+    async with sem:
+        for attempt in range(DBLP_MAX_RETRIES):
+            try:
+                response = await client.get(DBLP_API_URL, params=_dblp_params(stream_key, keyword, limit), timeout=30)
+                response.raise_for_status()
+                data = json.loads(response.content)
+                break
+            except Exception as exc:
+                status = exc.response.status_code if isinstance(exc, httpx.HTTPStatusError) else None
+                if status is not None and status != 429 and status < 500:
+                    print(f"[DBLP] 查询被拒绝，按无结果处理 ({stream_key}, {keyword}): {exc}")
+                    return []
+                if attempt == DBLP_MAX_RETRIES - 1:
+                    print(f"[DBLP] 请求失败 ({stream_key}, {keyword}): {exc}")
+                    return None
+                delay = _retry_after_seconds(exc)
+                if delay is None:
+                    delay = min(2.0 * (2 ** attempt), 30.0) * random.uniform(0.5, 1.5)
+                # 退避期间继续占着信号量，被限流时整体放慢
+                await asyncio.sleep(delay)
+            finally:
+                # 占着信号量休息，保证单个通道的请求间隔不小于 dblp_sleep
+                if sleep > 0:
+                    await asyncio.sleep(sleep)
+    return _parse_dblp_hits(data, start_year)
+
+
+def _dblp_pair_key(cfg: PipelineRunConfig, keyword: str, target: SearchTarget) -> str:
+    return json.dumps([target.stream_key, keyword, cfg.start_year, cfg.dblp_limit], ensure_ascii=False)
+
+
+def _load_dblp_pairs(path: str) -> Dict[str, List[Dict]]:
+    """读取逐组合的查询日志；中断时写了一半的最后一行直接忽略"""
+    done: Dict[str, List[Dict]] = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    done[entry["key"]] = entry["rows"]
+                except Exception:
+                    continue
+    return done
+
+
+async def _fetch_dblp_all(
+    cfg: PipelineRunConfig, done: Dict[str, List[Dict]], journal
+) -> List[Tuple[str, SearchTarget, Optional[List[Dict]]]]:
+    sem = asyncio.Semaphore(max(1, cfg.dblp_concurrency))
+    pairs = [(keyword, target) for keyword in cfg.keywords for target in cfg.targets]
+
+    async def _one(keyword: str, target: SearchTarget) -> Optional[List[Dict]]:
+        key = _dblp_pair_key(cfg, keyword, target)
+        if key in done:
+            return done[key]
+        rows = await _fetch_dblp_once_async(
+            client, sem, target.stream_key, keyword, cfg.start_year, cfg.dblp_limit, cfg.dblp_sleep
+        )
+        if rows is not None:
+            # 每个成功的 (关键词, 期刊) 组合立即追加到日志，重跑时只需补失败的组合
+            journal.write(json.dumps({"key": key, "rows": rows}, ensure_ascii=False) + "\n")
+            journal.flush()
+        return rows
+
+    async with httpx.AsyncClient(headers=HTTP_HEADERS) as client:
+        results = await asyncio.gather(*(_one(keyword, target) for keyword, target in pairs))
+    return [(keyword, target, rows) for (keyword, target), rows in zip(pairs, results)]
+
+
 def fetch_from_dblp(cfg: PipelineRunConfig) -> Tuple[pd.DataFrame, str]:
     ensure_dir(cfg.output_dir)
-    search_path = os.path.join(cfg.output_dir, f"{cfg.run_name}_search.xlsx")
+    search_base = os.path.join(cfg.output_dir, f"{cfg.run_name}_search")
+    search_path = f"{search_base}.{cfg.artifact_format}"
 
-    # 若启用恢复且搜索结果已存在，直接复用
-    if cfg.resume and os.path.exists(search_path):
-        df_cached = pd.read_excel(search_path)
-        print(f"[Step1] 复用已有搜索结果: {search_path} (共 {len(df_cached)} 条)")
-        return df_cached, search_path
+    # 若启用恢复且搜索结果已存在（任一格式），直接复用
+    if cfg.resume:
+        df_cached, cached_path = _read_stage_artifact(search_base)
+        if df_cached is not None:
+            print(f"[Step1] 复用已有搜索结果: {cached_path} (共 {len(df_cached)} 条)")
+            return df_cached, cached_path
 
     all_rows = []
-    print(f"[Step1] 开始 DBLP 搜索，请求间隔设置: {cfg.dblp_sleep}s") # 提示信息
-
-    for keyword in cfg.keywords:
-        for target in cfg.targets:
-            rows = fetch_dblp_once(target.stream_key, keyword, cfg.start_year, cfg.dblp_limit)
-            for row in rows:
-                row.update({"Keyword": keyword, "Source": target.name})
-            all_rows.extend(rows)
-            # 【新增】每次请求后休息一下，防止被封
-            if cfg.dblp_sleep > 0:
-                time.sleep(cfg.dblp_sleep)
-                print(f"[DBLP] 已请求: 关键词 '{keyword}' 在 '{target.name}'，获取 {len(rows)} 条记录，休息 {cfg.dblp_sleep}s")
-
+    print(f"[Step1] 开始 DBLP 搜索，并发数: {cfg.dblp_concurrency}，请求间隔设置: {cfg.dblp_sleep}s") # 提示信息
+
+    # 逐组合的查询日志：上次部分失败时，已成功的组合直接复用
+    pairs_path = f"{search_base}.pairs.jsonl"
+    done = _load_dblp_pairs(pairs_path) if cfg.resume else {}
+    if done:
+        print(f"[Step1] 复用上次已完成的 {len(done)} 个查询: {pairs_path}")
+    with open(pairs_path, "a" if cfg.resume else "w", encoding="utf-8") as journal:
+        results = asyncio.run(_fetch_dblp_all(cfg, done, journal))
+
+    failed = []
+    for keyword, target, rows in results:
+        if rows is None:
+            failed.append(f"{keyword} @ {target.name}")
+            continue
+        for row in rows:
+            row.update({"Keyword": keyword, "Source": target.name})
+        all_rows.extend(rows)
+        print(f"[DBLP] 已请求: 关键词 '{keyword}' 在 '{target.name}'，获取 {len(rows)} 条记录")
+
+    # 有请求最终失败时不写搜索结果，避免断点续跑复用被截断的结果
+    if failed:
+        raise RuntimeError(
+            f"DBLP 有 {len(failed)} 个请求重试后仍失败，已成功的查询保存在 {pairs_path}，"
+            f"重跑时只补这些组合（可先调大 dblp_sleep）: {', '.join(failed)}"
+        )
     if not all_rows:
         raise RuntimeError("DBLP 未找到符合条件的论文")
 
     df = pd.DataFrame(all_rows)
+    # 紧凑列类型：年份 int16，低基数字符串列用 category
+    df = df.astype({"Year": "int16", "Venue": "category", "Keyword": "category", "Source": "category"})
+    # DOI 统一在整列上一次性提取，避免逐条 re.search
+    df.insert(df.columns.get_loc("URL"), "DOI", df["URL"].str.extract(DOI_RE, expand=False).fillna(""))
     df = df.sort_values(by=["Year"], ascending=False)
-    df = df.drop_duplicates(subset=["DOI", "Title"], keep="first")
-    df.to_excel(search_path, index=False)
+    # 去重键：有 DOI 用 DOI，否则用规范化标题；哈希成 uint64 后单列去重
+    dedup_key = df["DOI"].where(df["DOI"] != "", df["Title"].astype(str).str.lower().str.strip())
+    df["_dedup"] = pd.util.hash_array(dedup_key.to_numpy(dtype=object))
+    df = df.drop_duplicates(subset=["_dedup"], keep="first").drop(columns="_dedup")
+    _save_df(df, search_base, cfg.artifact_format)
+    # 完整结果已落盘，逐组合日志不再需要
+    os.remove(pairs_path)
     print(f"[Step1] 共 {len(df)} 条记录写入 {search_path}")
     return df, search_path
 
@@ -154,16 +372,111 @@ def fetch_from_dblp(cfg: PipelineRunConfig) -> Tuple[pd.DataFrame, str]:
 # ---------------------------------------------------------------------------
 # Step 2: 抓取摘要 (Semantic Scholar)
 # ---------------------------------------------------------------------------
-def slugify(value: str) -> str:
-    value = re.sub(r"[^\w\s-]", "", value).strip().lower()
-    return re.sub(r"[-\s]+", "_", value)
+_SLUG_STRIP = re.compile(r"[^\w\s-]")
+_SLUG_WS = re.compile(r"[-\s]+")
+# ASCII 标题的快速路径：一次 str.translate 删除 _SLUG_STRIP 会去掉的全部 ASCII 字符
+_SLUG_ASCII_TABLE = str.maketrans("", "", "".join(chr(c) for c in range(128) if _SLUG_STRIP.match(chr(c))))
 
 
-def get_abstract_by_id(doi: Optional[str], title: str) -> Optional[str]:
+def slugify(value: str) -> str:
+    if value.isascii():
+        value = value.translate(_SLUG_ASCII_TABLE)
+    else:
+        value = _SLUG_STRIP.sub("", value)
+    return _SLUG_WS.sub("_", value.strip().lower())
+
+
+ABSTRACT_STORE_FILE = "abstracts.jsonl"
+ABSTRACT_INDEX_FILE = "abstracts.idx"
+
+
+class AbstractStore:
+    """摘要存储：所有摘要追加写入同一个 JSONL，dbm 索引记录 paper_id -> (offset, length)"""
+
+    def __init__(self, abstract_dir: str):
+        self.abstract_dir = ensure_dir(abstract_dir)
+        self.data_path = os.path.join(abstract_dir, ABSTRACT_STORE_FILE)
+        self._index = dbm.open(os.path.join(abstract_dir, ABSTRACT_INDEX_FILE), "c")
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "AbstractStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __contains__(self, paper_id: str) -> bool:
+        with self._lock:
+            return paper_id.encode("utf-8") in self._index
+
+    def put(self, paper_id: str, content: Dict, aliases: Iterable[str] = ()) -> None:
+        """追加一条摘要；aliases 中的 paper_id（同一篇论文的其他行）共用这条记录"""
+        line = json.dumps(content, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            if self._writer is None:
+                self._writer = open(self.data_path, "ab")
+            self._writer.seek(0, os.SEEK_END)
+            offset = self._writer.tell()
+            self._writer.write(line)
+            self._writer.flush()
+            # 先落盘数据再写索引，中断时最多留下一行无索引的孤立数据
+            entry = f"{offset},{len(line)}".encode("ascii")
+            for key in {paper_id, *aliases}:
+                self._index[key.encode("utf-8")] = entry
+
+    def get(self, paper_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._index.get(paper_id.encode("utf-8"))
+            if entry is None:
+                return None
+            offset, length = (int(x) for x in entry.decode("ascii").split(","))
+            if not os.path.exists(self.data_path):
+                return None
+            with open(self.data_path, "rb") as f:
+                f.seek(offset)
+                return json.loads(f.read(length))
+
+    def get_many(self, paper_ids: List[str]) -> Dict[str, Dict]:
+        """批量读取：按文件偏移排序后顺序扫描 JSONL，避免逐条随机读"""
+        with self._lock:
+            entries = []
+            for paper_id in set(paper_ids):
+                entry = self._index.get(paper_id.encode("utf-8"))
+                if entry is not None:
+                    offset, length = (int(x) for x in entry.decode("ascii").split(","))
+                    entries.append((offset, length, paper_id))
+            if not entries:
+                return {}
+            entries.sort()
+            records: Dict[str, Dict] = {}
+            with open(self.data_path, "rb") as f:
+                for offset, length, paper_id in entries:
+                    f.seek(offset)
+                    records[paper_id] = json.loads(f.read(length))
+            return records
+
+    def close(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._index.close()
+
+
+def get_abstract_by_id(
+    doi: Optional[str],
+    title: str,
+    session: Optional[requests.Session] = None,
+    limiter: Optional[RateLimiter] = None,
+) -> Optional[str]:
+    http = session or HTTP_SESSION
     if doi:
         url = f"https://api.semanticscholar.org/graph/v1/paper/DOI:{doi}"
         try:
-            res = requests.get(url, params={"fields": "abstract"}, timeout=10)
+            if limiter:
+                limiter.wait()
+            res = http.get(url, params={"fields": "abstract"}, timeout=10)
             if res.status_code == 200:
                 return res.json().get("abstract")
         except Exception:
@@ -171,7 +484,9 @@ def get_abstract_by_id(doi: Optional[str], title: str) -> Optional[str]:
 
     search_url = "https://api.semanticscholar.org/graph/v1/paper/search"
     try:
-        res = requests.get(
+        if limiter:
+            limiter.wait()
+        res = http.get(
             search_url,
             params={"query": title, "limit": 1, "fields": "abstract"},
             timeout=10,
@@ -188,33 +503,58 @@ def get_abstract_by_id(doi: Optional[str], title: str) -> Optional[str]:
 def fetch_and_index_abstracts(df: pd.DataFrame, cfg: PipelineRunConfig) -> Tuple[pd.DataFrame, str, str]:
     abs_dir = ensure_dir(os.path.join(cfg.output_dir, cfg.abstract_dir_name))
     df = df.copy()
-    if "Abstract_Link" not in df.columns:
-        df["Abstract_Link"] = ""
-
-    print(f"[Step2] 抓取摘要并保存至 {abs_dir}")
-    for index, row in tqdm(df.iterrows(), total=df.shape[0]):
-        paper_id = slugify(str(row["Title"])[:50])
-        filename = f"{paper_id}.json"
-        full_abs_path = os.path.join(abs_dir, filename)
-
-        if os.path.exists(full_abs_path):
-            df.at[index, "Abstract_Link"] = filename
-            continue
-
-        abstract_text = get_abstract_by_id(row.get("DOI"), row["Title"])
-
-        if abstract_text:
-            content = {"title": row["Title"], "doi": row.get("DOI"), "abstract": abstract_text}
-            with open(full_abs_path, "w", encoding="utf-8") as f:
-                json.dump(content, f, ensure_ascii=False, indent=4)
-            df.at[index, "Abstract_Link"] = filename
-        else:
-            df.at[index, "Abstract_Link"] = "Not_Found"
-
-        time.sleep(cfg.abstract_sleep)
 
-    indexed_path = os.path.join(cfg.output_dir, f"{cfg.run_name}_indexed.xlsx")
-    df.to_excel(indexed_path, index=False)
+    titles = df["Title"].tolist()
+    dois = df["DOI"].tolist() if "DOI" in df.columns else [None] * len(df)
+    links: List[str] = [""] * len(df)
+
+    workers = max(1, cfg.abstract_workers)
+    session = build_http_session(workers)
+    # 所有线程共享一个限速器：abstract_sleep 为全局相邻请求的最小间隔
+    limiter = RateLimiter(cfg.abstract_sleep)
+
+    with AbstractStore(abs_dir) as store:
+        # 先扫描本地已有摘要（JSONL 索引或旧版单文件），缺失的条目按 DOI（无则规范化标题）去重，
+        # 同一篇论文只请求一次，结果再回填到所有对应行
+        pending: Dict[str, Tuple[Optional[str], str, str]] = {}
+        lookup_rows: Dict[str, List[int]] = {}
+        for i, (doi, title) in enumerate(zip(dois, titles)):
+            paper_id = slugify(str(title)[:50])
+            if paper_id in store:
+                links[i] = paper_id
+            elif os.path.exists(os.path.join(abs_dir, f"{paper_id}.json")):
+                links[i] = f"{paper_id}.json"
+            else:
+                doi = doi if isinstance(doi, str) and doi else None
+                lookup = doi or str(title).lower().strip()
+                pending.setdefault(lookup, (doi, title, paper_id))
+                lookup_rows.setdefault(lookup, []).append(i)
+
+        def _fetch(lookup):
+            doi, title, _ = pending[lookup]
+            return lookup, get_abstract_by_id(doi, title, session, limiter)
+
+        print(f"[Step2] 抓取摘要并保存至 {abs_dir}，待抓取 {len(pending)} 条，并发数 {workers}")
+        found = set()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_fetch, lookup) for lookup in pending]
+            for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures)):
+                lookup, abstract_text = future.result()
+                if abstract_text:
+                    # 每抓到一条立即落盘，中途中断时已抓取的摘要不会丢失，重跑直接跳过
+                    doi, title, paper_id = pending[lookup]
+                    # 同组其他行的 paper_id 也写进索引，下次运行逐行检查时都能命中
+                    aliases = {slugify(str(titles[i])[:50]) for i in lookup_rows[lookup]}
+                    store.put(paper_id, {"title": title, "doi": doi, "abstract": abstract_text}, aliases)
+                    found.add(lookup)
+
+    # 每行都链接到自己的 paper_id（已作为别名写入索引），重跑时 Abstract_Link 保持不变
+    for lookup, rows in lookup_rows.items():
+        for i in rows:
+            links[i] = slugify(str(titles[i])[:50]) if lookup in found else "Not_Found"
+    df["Abstract_Link"] = links
+
+    indexed_path = _save_df(df, os.path.join(cfg.output_dir, f"{cfg.run_name}_indexed"), cfg.artifact_format)
     return df, indexed_path, abs_dir
 
 
@@ -226,25 +566,71 @@ def _load_ai_client(cfg: AIConfig) -> OpenAI:
     api_key = cfg.api_key or os.getenv(cfg.api_key_env)
     if not api_key:
         raise ValueError(f"未找到 API Key，请设置环境变量 {cfg.api_key_env}")
-    return OpenAI(api_key=api_key, base_url=cfg.base_url)
+    # 显式的连接池让并发批次复用 TLS 连接；transport 层只重试连接错误
+    http_client = httpx.Client(
+        transport=httpx.HTTPTransport(
+            limits=httpx.Limits(max_connections=cfg.max_workers * 2, max_keepalive_connections=cfg.max_workers),
+            retries=2,
+        ),
+        timeout=cfg.timeout,
+    )
+    return OpenAI(api_key=api_key, base_url=cfg.base_url, http_client=http_client)
+
+
+def _retry_after_seconds(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
 
 
-def _read_abstract(abstract_dir: str, link: str) -> str:
+def _read_abstract(store: AbstractStore, link: str) -> str:
     if not link or link == "Not_Found" or pd.isna(link):
         return "无摘要数据。"
-    path = os.path.join(abstract_dir, link)
-    if not os.path.exists(path):
-        return "找不到摘要文件。"
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("abstract", "摘要内容为空。")
+        if link.endswith(".json"):
+            # 兼容旧版：每篇摘要单独一个 JSON 文件
+            path = os.path.join(store.abstract_dir, link)
+            if not os.path.exists(path):
+                return "找不到摘要文件。"
+            with open(path, "rb") as f:
+                data = json.loads(f.read())
+        else:
+            data = store.get(link)
+            if data is None:
+                return "找不到摘要文件。"
+        return data.get("abstract", "摘要内容为空。")
     except Exception:
         return "摘要文件损坏。"
 
 
+def _prefetch_abstracts(store: AbstractStore, links: List[str]) -> Dict[str, str]:
+    """一次性预取所有待评审摘要，link 去重后只读一次"""
+    unique_links = {link for link in links if isinstance(link, str) and link and link != "Not_Found"}
+    records = store.get_many([link for link in unique_links if not link.endswith(".json")])
+    texts: Dict[str, str] = {}
+    for link in unique_links:
+        if link in records:
+            texts[link] = records[link].get("abstract", "摘要内容为空。")
+        else:
+            # 旧版单文件或索引缺失，走逐条读取以给出对应提示
+            texts[link] = _read_abstract(store, link)
+    return texts
+
+
+def _parse_ai_json(raw_text: str):
+    # 直接截取最外层 JSON 数组，一次切片即可跳过 ```json 围栏和多余说明文字
+    start, end = raw_text.find("["), raw_text.rfind("]")
+    if start != -1 and end > start:
+        raw_text = raw_text[start : end + 1]
+    return json.loads(raw_text)
+
+
 def _call_ai(client: OpenAI, ai_cfg: AIConfig, prompt: str):
-    max_retries = 3
+    max_retries = max(1, ai_cfg.max_retries)
     for attempt in range(max_retries):
         try:
             response = client.chat.completions.create(
@@ -254,64 +640,135 @@ def _call_ai(client: OpenAI, ai_cfg: AIConfig, prompt: str):
                 stream=False,
                 timeout=ai_cfg.timeout,
             )
-            raw_text = response.choices[0].message.content.strip()
-            cleaned_text = raw_text.replace("```json", "").replace("```", "").strip()
-            return json.loads(cleaned_text)
+            return _parse_ai_json(response.choices[0].message.content)
         except Exception as exc:
             if "429" in str(exc) or "rate limit" in str(exc).lower():
                 if attempt < max_retries - 1:
-                    time.sleep(5 * (attempt + 1))
+                    # 优先遵守服务端 Retry-After，否则 0.5s 起指数退避
+                    delay = _retry_after_seconds(exc)
+                    if delay is None:
+                        # 随机抖动避免多个线程同时重试
+                        delay = min(ai_cfg.retry_base_delay * (2 ** attempt), 30.0) * random.uniform(0.5, 1.5)
+                    time.sleep(delay)
                     continue
             print(f"[AI] 调用失败: {exc}")
             return None
     return None
 
 
-def _build_prompt(batch_df: pd.DataFrame, abstract_dir: str) -> Tuple[str, List[int]]:
-    user_prompt = "请分析以下文献摘要，并返回 JSON 数组：\n\n"
-    indices: List[int] = []
+def _match_ai_results(ai_results, count: int) -> Dict[int, Dict]:
+    """按 id（即提示词中的 [文献 i]，从 1 开始）对齐 AI 返回结果，返回 {序号(0 起): 结果}"""
+    if not isinstance(ai_results, list):
+        return {}
+    items = [item for item in ai_results if isinstance(item, dict)]
+    matched: Dict[int, Dict] = {}
+    for item in items:
+        try:
+            idx = int(item.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= idx < count:
+            matched.setdefault(idx, item)
+    # 模型没有回传任何 id 时，只有条数完全一致才按位置对齐
+    if not matched and len(items) == count:
+        matched = dict(enumerate(items))
+    return matched
+
+
+def _build_prompt(items: List[Tuple[str, str]]) -> str:
+    parts = ["请分析以下文献摘要，并返回 JSON 数组：\n\n"]
+    for i, (title, abstract) in enumerate(items):
+        parts.append(f"[文献 {i+1}]\n标题: {title}\n摘要: {abstract}\n\n")
+    return "".join(parts)
+
+
+def _ai_cache_key(ai_cfg: AIConfig, title: str, abstract: str) -> str:
+    payload = json.dumps([ai_cfg.model, ai_cfg.system_prompt, title, abstract], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
-    for i, (idx, row) in enumerate(batch_df.iterrows()):
-        abstract = _read_abstract(abstract_dir, row["Abstract_Link"])
-        user_prompt += f"[文献 {i+1}]\n标题: {row['Title']}\n摘要: {abstract}\n\n"
-        indices.append(idx)
-    return user_prompt, indices
+
+CHECKPOINT_CONSOLIDATE_EVERY = 50  # 每隔多少个批次把追加日志合并进完整检查点
+AI_FAILED_REASON = "AI返回不足或失败"  # 失败占位理由，带此理由的行在续跑时视为未评分
+
+
+def _checkpoint_journal_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".jsonl"
 
 
 def _load_checkpoint(path: str) -> Dict[int, Dict[str, str]]:
-    if not path or not os.path.exists(path):
-        return {}
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return {int(k): v for k, v in data.items()}
-    except Exception:
+    if not path:
         return {}
+    results: Dict[int, Dict[str, str]] = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                results = {int(k): v for k, v in data.items()}
+        except Exception:
+            results = {}
+
+    # 再叠加追加日志中尚未合并的记录；中断时写了一半的最后一行直接忽略
+    journal_path = _checkpoint_journal_path(path)
+    if os.path.exists(journal_path):
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    results[int(entry["row_id"])] = {"score": entry["score"], "reason": entry["reason"]}
+                except Exception:
+                    continue
+    # 旧版检查点里可能记有失败占位，视为未评分以便重试
+    return {k: v for k, v in results.items() if v.get("reason") != AI_FAILED_REASON}
 
 
 def _save_checkpoint(path: str, data: Dict[int, Dict[str, str]]):
     ensure_dir(os.path.dirname(path) or ".")
-    with open(path, "w", encoding="utf-8") as f:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump({str(k): v for k, v in data.items()}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _append_checkpoint(journal, entries: Dict[int, Dict[str, str]]):
+    for row_id, res in entries.items():
+        journal.write(json.dumps({"row_id": row_id, "score": res["score"], "reason": res["reason"]}, ensure_ascii=False) + "\n")
+    journal.flush()
 
 
 def _load_existing_results_from_output(path: str) -> Dict[int, Dict[str, str]]:
     if not os.path.exists(path):
         return {}
     try:
-        df_existing = pd.read_excel(path)
+        df_existing = pd.read_excel(path, engine="calamine")
         if "AI_Score" not in df_existing.columns or "AI_Reason" not in df_existing.columns:
             return {}
+        if "RowId" not in df_existing.columns:
+            df_existing["RowId"] = df_existing.index
         results = {}
-        for _, row in df_existing.iterrows():
-            row_id = int(row["RowId"]) if "RowId" in df_existing.columns else _
-            if pd.notna(row.get("AI_Score")):
-                results[row_id] = {"score": row.get("AI_Score", 0), "reason": row.get("AI_Reason", "")}
+        for row_id, score, reason in df_existing[["RowId", "AI_Score", "AI_Reason"]].itertuples(index=False, name=None):
+            if pd.notna(score) and reason != AI_FAILED_REASON:
+                results[int(row_id)] = {"score": score, "reason": reason}
         return results
     except Exception:
         return {}
 
 
+def _write_scores(df: pd.DataFrame, results_map: Dict[int, Dict[str, str]], output_path: str) -> pd.DataFrame:
+    """把评分结果按 RowId 一次性 join 回原表，排序后写出"""
+    results_df = pd.DataFrame.from_records(
+        [(row_id, res.get("score", 0), res.get("reason", "处理遗漏")) for row_id, res in results_map.items()],
+        columns=["RowId", "AI_Score", "AI_Reason"],
+    )
+    df = df.drop(columns=["AI_Score", "AI_Reason"], errors="ignore")
+    df = df.join(results_df.set_index("RowId"), on="RowId")
+    df = df.fillna({"AI_Score": 0, "AI_Reason": "处理遗漏"})
+    # 分数只有 0-5，压成 int8；模型偶尔返回的非数字分数按 0 处理
+    df["AI_Score"] = pd.to_numeric(df["AI_Score"], errors="coerce").fillna(0).astype("int8")
+    df = df.sort_values(by="AI_Score", ascending=False)
+    df.to_excel(output_path, index=False)
+    return df
+
+
 def run_ai_scoring(df: pd.DataFrame, abstract_dir: str, ai_cfg: AIConfig, output_path: str) -> pd.DataFrame:
     client = _load_ai_client(ai_cfg)
     df = df.copy()
@@ -330,48 +787,86 @@ def run_ai_scoring(df: pd.DataFrame, abstract_dir: str, ai_cfg: AIConfig, output
 
     if len(pending_df) == 0:
         print(f"[Step3] 检测到已有评分，跳过 API 调用，直接写入 {output_path}")
-        df["AI_Score"] = df["RowId"].map(lambda x: results_map.get(x, {}).get("score", 0))
-        df["AI_Reason"] = df["RowId"].map(lambda x: results_map.get(x, {}).get("reason", "处理遗漏"))
-        df = df.sort_values(by="AI_Score", ascending=False)
-        df.to_excel(output_path, index=False)
-        return df
-
-    chunks = [pending_df.iloc[i : i + ai_cfg.batch_size] for i in range(0, len(pending_df), ai_cfg.batch_size)]
-
-    print(f"[Step3] AI 评审，待处理 {len(pending_df)} 条，共 {len(chunks)} 个批次，并发数 {ai_cfg.max_workers}")
-    with concurrent.futures.ThreadPoolExecutor(max_workers=ai_cfg.max_workers) as executor:
-        future_to_indices = {}
-        for chunk in chunks:
-            prompt, indices = _build_prompt(chunk, abstract_dir)
-            future = executor.submit(_call_ai, client, ai_cfg, prompt)
-            # 将 RowId 对齐
-            row_ids = [int(chunk.iloc[j]["RowId"]) for j in range(len(indices))]
-            future_to_indices[future] = row_ids
-
-        for future in tqdm(concurrent.futures.as_completed(future_to_indices), total=len(future_to_indices), desc="AI 评审进度"):
-            indices = future_to_indices[future]
-            try:
-                ai_results = future.result()
-            except Exception as exc:
-                print(f"[AI] 批次异常: {exc}")
-                ai_results = None
-
-            for j, row_id in enumerate(indices):
-                if ai_results and isinstance(ai_results, list) and j < len(ai_results):
-                    results_map[row_id] = {
-                        "score": ai_results[j].get("score", 0),
-                        "reason": ai_results[j].get("reason", "无理由"),
-                    }
-                else:
-                    results_map[row_id] = {"score": 0, "reason": "AI返回不足或失败"}
-
-            # 每处理一批就落盘检查点，支持断点续跑
-            _save_checkpoint(checkpoint_path, results_map)
-
-    df["AI_Score"] = df["RowId"].map(lambda x: results_map.get(x, {}).get("score", 0))
-    df["AI_Reason"] = df["RowId"].map(lambda x: results_map.get(x, {}).get("reason", "处理遗漏"))
-    df = df.sort_values(by="AI_Score", ascending=False)
-    df.to_excel(output_path, index=False)
+        return _write_scores(df, results_map, output_path)
+
+    links = pending_df["Abstract_Link"].tolist()
+    with AbstractStore(abstract_dir) as store:
+        abstract_texts = _prefetch_abstracts(store, links)
+        abstracts = [abstract_texts[link] if link in abstract_texts else _read_abstract(store, link) for link in links]
+
+    # 内容寻址缓存：(模型, 提示词, 标题, 摘要) 相同即复用历史评分，相同内容只请求一次
+    cache_path = ai_cfg.ai_cache_path or os.path.join(os.path.dirname(output_path) or ".", "ai_cache")
+    cache = dbm.open(cache_path, "c")
+    # 失败的行只写进本次输出，不进检查点和缓存，下次运行会重新请求
+    failed: Dict[int, Dict[str, str]] = {}
+    journal_path = _checkpoint_journal_path(checkpoint_path)
+    journal = open(journal_path, "a", encoding="utf-8")
+    try:
+        to_score: Dict[str, Tuple[str, str]] = {}
+        key_rows: Dict[str, List[int]] = {}
+        cache_hits = 0
+        for row_id, title, abstract in zip(pending_df["RowId"].tolist(), pending_df["Title"].tolist(), abstracts):
+            key = _ai_cache_key(ai_cfg, title, abstract)
+            cached = cache.get(key)
+            if cached is not None:
+                results_map[int(row_id)] = json.loads(cached)
+                cache_hits += 1
+                continue
+            to_score.setdefault(key, (title, abstract))
+            key_rows.setdefault(key, []).append(int(row_id))
+
+        keys = list(to_score)
+        chunks = [keys[i : i + ai_cfg.batch_size] for i in range(0, len(keys), ai_cfg.batch_size)]
+
+        print(
+            f"[Step3] AI 评审，待处理 {len(pending_df)} 条（缓存命中 {cache_hits} 条），"
+            f"共 {len(chunks)} 个批次，并发数 {ai_cfg.max_workers}"
+        )
+        with concurrent.futures.ThreadPoolExecutor(max_workers=ai_cfg.max_workers) as executor:
+            future_to_keys = {}
+            for chunk in chunks:
+                prompt = _build_prompt([to_score[key] for key in chunk])
+                future_to_keys[executor.submit(_call_ai, client, ai_cfg, prompt)] = chunk
+
+            for done, future in enumerate(
+                tqdm(concurrent.futures.as_completed(future_to_keys), total=len(future_to_keys), desc="AI 评审进度"), 1
+            ):
+                chunk = future_to_keys[future]
+                try:
+                    ai_results = future.result()
+                except Exception as exc:
+                    print(f"[AI] 批次异常: {exc}")
+                    ai_results = None
+
+                matched = _match_ai_results(ai_results, len(chunk))
+                batch_results: Dict[int, Dict[str, str]] = {}
+                for j, key in enumerate(chunk):
+                    item = matched.get(j)
+                    if item is None:
+                        for row_id in key_rows[key]:
+                            failed[row_id] = {"score": 0, "reason": AI_FAILED_REASON}
+                        continue
+                    result = {"score": item.get("score", 0), "reason": item.get("reason", "无理由")}
+                    cache[key] = json.dumps(result, ensure_ascii=False)
+                    for row_id in key_rows[key]:
+                        batch_results[row_id] = result
+                results_map.update(batch_results)
+
+                # 每批只追加本批结果到日志，定期合并成完整检查点，支持断点续跑
+                _append_checkpoint(journal, batch_results)
+                if done % CHECKPOINT_CONSOLIDATE_EVERY == 0:
+                    _save_checkpoint(checkpoint_path, results_map)
+                    journal.seek(0)
+                    journal.truncate()
+    finally:
+        cache.close()
+        journal.close()
+        _save_checkpoint(checkpoint_path, results_map)
+        os.remove(journal_path)
+
+    if failed:
+        print(f"[Step3] {len(failed)} 条评分失败，已记为 0 分，下次运行会重新请求")
+    df = _write_scores(df, {**results_map, **failed}, output_path)
     print(f"[Step3] 结果写入 {output_path} (检查点保存在 {checkpoint_path})")
     return df
 
@@ -403,6 +898,7 @@ __all__ = [
     "AIConfig",
     "fetch_from_dblp",
     "fetch_and_index_abstracts",
+    "AbstractStore",
     "run_ai_scoring",
     "run_full_pipeline",
 ]
@@ -1,5 +1,18 @@
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+def _write_one(task):
+    """写入单个论文 JSON，返回 (文件路径, 错误信息或 None)"""
+    file_path, paper = task
+    try:
+        # ensure_ascii=False 确保中文能正常显示；紧凑分隔符减少序列化与写入量
+        data = json.dumps(paper, ensure_ascii=False, separators=(",", ":"))
+        with open(file_path, 'w', encoding='utf-8') as out_f:
+            out_f.write(data)
+        return file_path, None
+    except Exception as e:
+        return file_path, e
 
 def split_json_papers(input_filename='paper_38.json', output_folder='papers2'):
     # 1. 检查输入文件是否存在
@@ -23,9 +36,9 @@ def split_json_papers(input_filename='paper_38.json', output_folder='papers2'):
             return
 
         papers = data["papers"]
-        count = 0
+        tasks = []
 
-        # 4. 遍历并单独保存
+        # 4. 遍历并收集待写入的文件
         for paper in papers:
             try:
                 # 获取 index
@@ -38,20 +51,21 @@ def split_json_papers(input_filename='paper_38.json', output_folder='papers2'):
                 # 格式化文件名：例如 6 -> "06.json", 36 -> "36.json"
                 # :02d 表示不足两位数时左侧补零
                 file_name = f"{idx:02d}.json"
-                file_path = os.path.join(output_folder, file_name)
-
-                # 写入单个 JSON 文件
-                with open(file_path, 'w', encoding='utf-8') as out_f:
-                    # ensure_ascii=False 确保中文能正常显示，而不是显示 \uXXXX
-                    # indent=4 确保输出格式美观
-                    json.dump(paper, out_f, ensure_ascii=False, indent=4)
-                
-                print(f"已保存: {file_path}")
-                count += 1
+                tasks.append((os.path.join(output_folder, file_name), paper))
 
             except Exception as e:
                 print(f"处理 index 为 {idx} 的论文时出错: {e}")
 
+        # 5. 多线程并行写入 (I/O 密集，写文件时会释放 GIL)
+        count = 0
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for file_path, error in executor.map(_write_one, tasks):
+                if error is None:
+                    print(f"已保存: {file_path}")
+                    count += 1
+                else:
+                    print(f"写入 {file_path} 时出错: {error}")
+
         print(f"\n处理完成！共拆分出 {count} 个文件到 '{output_folder}' 文件夹。")
 
     except json.JSONDecodeError:
@@ -1,13 +1,29 @@
 # step1_fetch_dblp.py (路径增强版)
+import json
 import requests
 import pandas as pd
 import re
 import os  # 用于处理文件路径和文件夹创建
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 模块级共享 Session：复用 TCP/TLS 连接，并对 429/5xx 自动重试
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False),
+))
+# 显式声明压缩协商并标明客户端身份，响应体由 requests 自动解压
+SESSION.headers.update({"Accept-Encoding": "gzip, deflate", "User-Agent": "get_pappers/1.0"})
+
+# 匹配 https://doi.org/ 之后的字符串 (模块加载时编译一次)
+_DOI_RE = re.compile(r'doi.org/(10\.\d{4,}/[-._;()/:a-zA-Z0-9]+)')
 
 def extract_doi(url):
     if not url: return ""
-    # 匹配 https://doi.org/ 之后的字符串
-    match = re.search(r'doi.org/(10\.\d{4,}/[-._;()/:a-zA-Z0-9]+)', url)
+    match = _DOI_RE.search(url)
     return match.group(1) if match else ""
 
 def fetch_and_save_from_dblp(stream_key, keyword, start_year=2022, filename="papers.xlsx", save_path="output/"):
@@ -18,15 +34,17 @@ def fetch_and_save_from_dblp(stream_key, keyword, start_year=2022, filename="pap
     query = f"stream:{stream_key}: {keyword}"
     params = {'q': query, 'format': 'json', 'h': 1000}
     
-    response = requests.get(url, params=params)
+    response = SESSION.get(url, params=params)
     if response.status_code != 200: 
         print("请求 DBLP 失败")
         return
 
-    data = response.json()
+    # 直接解析原始字节，跳过 requests 的文本解码与编码探测
+    data = json.loads(response.content)
     hits = data.get('result', {}).get('hits', {}).get('hit', [])
     
-    rows = []
+    # 按列收集，最后一次性构造 DataFrame，避免逐行创建字典
+    years, titles, authors, venues, dois, urls = [], [], [], [], [], []
     for hit in hits:
         info = hit.get('info', {})
         year = int(info.get('year', 0))
@@ -39,16 +57,16 @@ def fetch_and_save_from_dblp(stream_key, keyword, start_year=2022, filename="pap
                 authors_str = ", ".join([a.get('text', '') for a in authors_data])
 
             ee_url = info.get('ee', '')
-            rows.append({
-                'Year': year,
-                'Title': info.get('title'),
-                'Authors': authors_str,
-                'Venue': info.get('venue'),
-                'DOI': extract_doi(ee_url),
-                'URL': ee_url
-            })
+            years.append(year)
+            titles.append(info.get('title'))
+            authors.append(authors_str)
+            venue = info.get('venue')
+            # 少数条目的 venue 是列表，拼成字符串以便存为 category
+            venues.append(", ".join(venue) if isinstance(venue, list) else venue)
+            dois.append(extract_doi(ee_url))
+            urls.append(ee_url)
             
-    if not rows:
+    if not years:
         print("未找到符合条件的论文")
         return
 
@@ -59,10 +77,19 @@ def fetch_and_save_from_dblp(stream_key, keyword, start_year=2022, filename="pap
     # 2. 拼接完整路径
     full_path = os.path.join(save_path, filename)
     
-    # 3. 保存文件
-    df = pd.DataFrame(rows)
-    df.to_excel(full_path, index=False)
-    print(f"成功保存 {len(rows)} 篇论文到: {full_path}")
+    # 3. 保存文件 (xlsxwriter 比默认的 openpyxl 写入快得多)
+    # 注意不能开 constant_memory：pandas 按列写单元格，该模式只接受按行顺序写入，会丢数据
+    # Year 用 int16、Venue 只有少数取值用 category，降低内存占用
+    df = pd.DataFrame({
+        'Year': pd.Series(years, dtype='int16'),
+        'Title': titles,
+        'Authors': authors,
+        'Venue': pd.Series(venues, dtype='category'),
+        'DOI': dois,
+        'URL': urls
+    })
+    df.to_excel(full_path, index=False, engine="xlsxwriter")
+    print(f"成功保存 {len(df)} 篇论文到: {full_path}")
 
 # step1_fetch_dblp.py 的执行逻辑建议
 if __name__ == "__main__":
@@ -78,7 +105,12 @@ if __name__ == "__main__":
     keyword = "planning|semantic segmentation|traversability"
     start_year = 2022
     
-    for stream_key, short_name in tasks:
+    def run_task(task):
+        stream_key, short_name = task
         filename = f"{short_name}_test_{start_year}_2025.xlsx"
         print(f"\n--- 正在抓取 {short_name} ---")
-        fetch_and_save_from_dblp(stream_key, keyword, start_year, filename)
\ No newline at end of file
+        fetch_and_save_from_dblp(stream_key, keyword, start_year, filename)
+
+    # 各期刊/会议的请求互不依赖，并行执行，总耗时取决于最慢的一个
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        list(executor.map(run_task, tasks))
\ No newline at end of file
@@ -1,82 +1,274 @@
 # step2_fetch_abstracts.py
+import asyncio
+import dbm
+import hashlib
+import httpx
 import pandas as pd
-import requests
-import time
 import os
 import json
+import random
 import re
-from tqdm import tqdm
+from tqdm.asyncio import tqdm_asyncio
+
+# 显式声明压缩协商并标明客户端身份，响应体由 httpx 自动解压
+HEADERS = {"Accept-Encoding": "gzip, deflate", "User-Agent": "get_pappers/1.0"}
+
+_NONWORD_RE = re.compile(r'[^\w\s-]')
+_SPACE_RE = re.compile(r'[-\s]+')
 
 def slugify(value):
     """将标题转换为安全的文件名"""
-    value = re.sub(r'[^\w\s-]', '', value).strip().lower()
-    return re.sub(r'[-\s]+', '_', value)
-
-def get_abstract_by_id(doi, title):
-    """通过 DOI 或 Title 访问 Semantic Scholar"""
-    # 1. 优先使用 DOI
-    if pd.notna(doi) and doi != "":
-        url = f"https://api.semanticscholar.org/graph/v1/paper/DOI:{doi}"
+    value = _NONWORD_RE.sub('', value).strip().lower()
+    return _SPACE_RE.sub('_', value)
+
+MAX_CONCURRENCY = 5  # 同时在途的请求数
+BATCH_SIZE = 500  # /paper/batch 单次最多接受的 ID 数
+REQUEST_INTERVAL = 1.2  # 全局相邻两次请求的最小间隔 (API 频率限制)，与并发数无关
+SS_CACHE_NAME = ".ss_cache"  # Semantic Scholar 响应缓存 (dbm)，与输入 Excel 同目录
+# 分步脚本的摘要目录与流水线 (paper_pipeline 的 abstracts/，JSONL + dbm 索引) 分开，两者互不读取
+ABSTRACT_DIR_NAME = "abstracts_scripts"
+LEGACY_ABSTRACT_DIR_NAME = "abstracts"  # 旧版单篇 JSON 文件所在目录
+ABSTRACT_TABLE = "abstracts.parquet"  # 全部摘要存成一张表，位于 ABSTRACT_DIR_NAME 目录下
+FLUSH_EVERY = 200  # 每新增这么多条摘要就把摘要表写回磁盘一次
+
+def backoff_delay(attempt, res=None, base=2.0, cap=30.0):
+    """429/5xx 退避时长：优先服从 Retry-After，否则指数退避并乘以随机抖动，避免并发请求同时重试"""
+    retry_after = res.headers.get("Retry-After") if res is not None else None
+    if retry_after:
         try:
-            res = requests.get(url, params={'fields': 'abstract'}, timeout=10)
-            if res.status_code == 200:
-                return res.json().get('abstract')
-        except:
+            return float(retry_after)
+        except ValueError:
             pass
+    return min(cap, base * (2 ** attempt)) * random.uniform(0.5, 1.5)
 
-    # 2. 备选标题搜索
-    search_url = "https://api.semanticscholar.org/graph/v1/paper/search"
-    try:
-        res = requests.get(search_url, params={'query': title, 'limit': 1, 'fields': 'abstract'}, timeout=10)
-        if res.status_code == 200:
-            data = res.json()
-            if data.get('total', 0) > 0:
-                return data['data'][0].get('abstract')
-    except:
-        pass
+class AsyncRateLimiter:
+    """协程版全局限速器：按调用顺序分配发送时间槽，相邻两次请求至少间隔 interval 秒"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._next_slot = 0.0
+
+    async def wait(self):
+        # 事件循环是单线程的，领取时间槽无需加锁
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+async def _get_json_async(client, limiter, url, params, max_retries=3):
+    """异步 GET，遇到 429/5xx 按带抖动的指数退避重试；返回 (状态码, JSON 或 None)"""
+    for attempt in range(max_retries):
+        await limiter.wait()
+        res = await client.get(url, params=params, timeout=10)
+        if (res.status_code == 429 or res.status_code >= 500) and attempt < max_retries - 1:
+            await asyncio.sleep(backoff_delay(attempt, res))
+            continue
+        return res.status_code, (res.json() if res.status_code == 200 else None)
+    return None, None
+
+async def get_abstract_by_id_async(client, sem, limiter, doi, title):
+    """
+    通过 DOI 或 Title 访问 Semantic Scholar，由信号量限制并发、limiter 限制全局速率
+    返回 (摘要或 None, 结果是否确定)；网络错误、限流等不确定的结果不应写入缓存
+    """
+    async with sem:
+        definitive = True
+        # 1. 优先使用 DOI
+        if pd.notna(doi) and doi != "":
+            url = f"https://api.semanticscholar.org/graph/v1/paper/DOI:{doi}"
+            try:
+                status, data = await _get_json_async(client, limiter, url, {'fields': 'abstract'})
+                if data:
+                    return data.get('abstract'), True
+                definitive = status == 404
+            except Exception:
+                definitive = False
+
+        # 2. 备选标题搜索
+        search_url = "https://api.semanticscholar.org/graph/v1/paper/search"
+        try:
+            status, data = await _get_json_async(client, limiter, search_url, {'query': title, 'limit': 1, 'fields': 'abstract'})
+            if data and data.get('total', 0) > 0:
+                return data['data'][0].get('abstract'), True
+            return None, definitive and status == 200
+        except Exception:
+            return None, False
+
+async def _fetch_batch_async(client, limiter, dois):
+    """
+    通过 POST /paper/batch 一次查询最多 BATCH_SIZE 个 DOI，按输入顺序返回结果列表
+    查不到的 DOI 对应位置为 None；整批请求失败时返回 None
+    """
+    url = "https://api.semanticscholar.org/graph/v1/paper/batch"
+    for attempt in range(3):
+        await limiter.wait()
+        try:
+            res = await client.post(url, params={'fields': 'abstract'},
+                                    json={'ids': [f"DOI:{d}" for d in dois]}, timeout=30)
+        except Exception:
+            return None
+        if (res.status_code == 429 or res.status_code >= 500) and attempt < 2:
+            await asyncio.sleep(backoff_delay(attempt, res))
+            continue
+        return res.json() if res.status_code == 200 else None
     return None
 
+async def fetch_abstracts_async(papers, on_result=None):
+    """
+    并发抓取 [(doi, title), ...]，按输入顺序返回 (摘要, 是否确定) 列表
+    on_result(下标, 摘要, 是否确定) 在每条结果到达时立即回调，调用方可借此逐条落盘
+    """
+    results = [None] * len(papers)
+
+    def _done(k, res):
+        results[k] = res
+        if on_result is not None:
+            on_result(k, *res)
+
+    fallback = []  # 需要逐篇查询的 (下标, doi, title)
+    limiter = AsyncRateLimiter(REQUEST_INTERVAL)
+    # transport 层重试连接错误，429/5xx 由上面的请求函数按退避重试
+    async with httpx.AsyncClient(headers=HEADERS, transport=httpx.AsyncHTTPTransport(retries=3)) as client:
+        # 1. 有 DOI 的论文先走批量接口，每批 BATCH_SIZE 个
+        with_doi = [k for k, (doi, _) in enumerate(papers) if pd.notna(doi) and doi != ""]
+        for start in range(0, len(with_doi), BATCH_SIZE):
+            chunk = with_doi[start:start + BATCH_SIZE]
+            data = await _fetch_batch_async(client, limiter, [papers[k][0] for k in chunk])
+            if data is None:
+                # 整批失败，退回逐篇查询 (含 DOI)
+                fallback.extend((k, *papers[k]) for k in chunk)
+            else:
+                for k, item in zip(chunk, data):
+                    if item:
+                        _done(k, (item.get('abstract'), True))
+                    else:
+                        # DOI 查不到，只做标题搜索
+                        fallback.append((k, None, papers[k][1]))
+
+        # 2. 没有 DOI 或批量未命中的论文，逐篇并发查询
+        fallback.extend((k, doi, title) for k, (doi, title) in enumerate(papers)
+                        if not (pd.notna(doi) and doi != ""))
+        sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+        async def _one(k, doi, title):
+            _done(k, await get_abstract_by_id_async(client, sem, limiter, doi, title))
+
+        await tqdm_asyncio.gather(*(_one(k, doi, title) for k, doi, title in fallback))
+    return results
+
+def _cache_key(doi, title):
+    """以 DOI|标题 的哈希作为缓存键"""
+    doi = doi if pd.notna(doi) else ""
+    return hashlib.sha1(f"{doi}|{title}".encode("utf-8")).hexdigest()
+
+def _table_row(paper_id, title, doi, abstract_text):
+    """摘要表的一行：key 即写入 Abstract_Link 的 ID"""
+    return {
+        "key": paper_id,
+        "title": str(title),
+        "doi": doi if pd.notna(doi) else None,
+        "abstract": abstract_text,
+    }
+
 def update_excel_and_save_abstracts(input_file, output_file):
     # 确保文件夹结构存在
     base_path = os.path.dirname(input_file)
-    abs_dir = os.path.join(base_path, "abstracts")
+    abs_dir = os.path.join(base_path, ABSTRACT_DIR_NAME)
+    legacy_dir = os.path.join(base_path, LEGACY_ABSTRACT_DIR_NAME)
     os.makedirs(abs_dir, exist_ok=True)
 
-    df = pd.read_excel(input_file)
-    if 'Abstract_Link' not in df.columns:
-        df['Abstract_Link'] = ""
+    df = pd.read_excel(input_file, engine="calamine")  # Rust 实现的解析器，比 openpyxl 快得多
+    titles = df['Title'].tolist()
+    dois = df['DOI'].tolist() if 'DOI' in df.columns else [None] * len(df)
+    links = [""] * len(df)
 
-    print(f"开始抓取摘要，文件将存入: {abs_dir}")
+    table_path = os.path.join(abs_dir, ABSTRACT_TABLE)
+    # 旧版把摘要表放在 abstracts/ 下，与流水线共用目录；首次运行时挪到新目录
+    old_table_path = os.path.join(legacy_dir, ABSTRACT_TABLE)
+    if not os.path.exists(table_path) and os.path.exists(old_table_path):
+        os.replace(old_table_path, table_path)
+    print(f"开始抓取摘要，摘要表将存入: {table_path}")
 
-    for index, row in tqdm(df.iterrows(), total=df.shape[0]):
-        # 生成唯一文件名 (基于标题)
-        paper_id = slugify(str(row['Title'])[:50])
-        filename = f"{paper_id}.json"
-        full_abs_path = os.path.join(abs_dir, filename)
+    # 已有的摘要表 (key 列即 Abstract_Link)
+    if os.path.exists(table_path):
+        table = pd.read_parquet(table_path)
+        known = set(table['key'])
+    else:
+        table = None
+        known = set()
+    new_rows = []
 
-        # 如果文件已存在，跳过请求
-        if os.path.exists(full_abs_path):
-            df.at[index, 'Abstract_Link'] = filename
+    # 1. 先筛出摘要表里还没有的论文
+    pending = []
+    for i, (doi, title) in enumerate(zip(dois, titles)):
+        # 生成唯一 ID (基于标题)
+        paper_id = slugify(str(title)[:50])
+
+        if paper_id in known:
+            links[i] = paper_id
             continue
 
-        # 获取摘要
-        abstract_text = get_abstract_by_id(row.get('DOI'), row['Title'])
-        
-        if abstract_text:
-            # 存储为结构化 JSON
-            content = {
-                "title": row['Title'],
-                "doi": row.get('DOI'),
-                "abstract": abstract_text
-            }
-            with open(full_abs_path, 'w', encoding='utf-8') as f:
-                json.dump(content, f, ensure_ascii=False, indent=4)
-            
-            df.at[index, 'Abstract_Link'] = filename
+        # 兼容旧版：单篇 JSON 文件直接并入摘要表，无需重新请求
+        legacy_path = os.path.join(legacy_dir, f"{paper_id}.json")
+        if os.path.exists(legacy_path):
+            with open(legacy_path, 'rb') as f:
+                content = json.loads(f.read())
+            new_rows.append(_table_row(paper_id, content.get('title', title), content.get('doi', doi), content.get('abstract')))
+            known.add(paper_id)
+            links[i] = paper_id
         else:
-            df.at[index, 'Abstract_Link'] = "Not_Found"
+            pending.append((i, doi, title, paper_id))
+
+    def flush():
+        """把 new_rows 并入摘要表并整表写出 (zstd 压缩)"""
+        nonlocal table
+        if not new_rows:
+            return
+        table = pd.concat([table, pd.DataFrame(new_rows)], ignore_index=True) if table is not None else pd.DataFrame(new_rows)
+        table = table.drop_duplicates('key', keep='last')
+        table.to_parquet(table_path, compression='zstd', index=False)
+        new_rows.clear()
+
+    # 2. 查询本地响应缓存 (包括确认查不到的论文)，只对未命中的发请求
+    abstracts = [None] * len(pending)
+    try:
+        with dbm.open(os.path.join(base_path, SS_CACHE_NAME), "c") as cache:
+            misses = []
+            for j, (_, doi, title, paper_id) in enumerate(pending):
+                cached = cache.get(_cache_key(doi, title))
+                if cached is None:
+                    misses.append(j)
+                    continue
+                abstracts[j] = json.loads(cached)["abstract"]
+                if abstracts[j]:
+                    new_rows.append(_table_row(paper_id, title, doi, abstracts[j]))
+
+            def on_result(k, abstract_text, definitive):
+                # 每条结果到达即写缓存、攒入摘要表，中途中断时已抓取的结果不会丢失
+                j = misses[k]
+                _, doi, title, paper_id = pending[j]
+                abstracts[j] = abstract_text
+                if definitive:
+                    cache[_cache_key(doi, title)] = json.dumps({"abstract": abstract_text}, ensure_ascii=False)
+                if abstract_text:
+                    new_rows.append(_table_row(paper_id, title, doi, abstract_text))
+                    if len(new_rows) >= FLUSH_EVERY:
+                        flush()
+
+            # 3. 批量 + 并发获取摘要
+            print(f"待抓取 {len(misses)} 篇 (缓存命中 {len(pending) - len(misses)} 篇)，并发数: {MAX_CONCURRENCY}")
+            asyncio.run(fetch_abstracts_async([pending[j][1:3] for j in misses], on_result))
+    finally:
+        # 无论是否中断，已攒下的摘要都写回摘要表
+        flush()
+
+    # 4. 回填索引列
+    for (i, _, _, paper_id), abstract_text in zip(pending, abstracts):
+        links[i] = paper_id if abstract_text else "Not_Found"
 
-        time.sleep(1.2) # API 频率限制
+    # 循环结束后一次性写回整列
+    df['Abstract_Link'] = links
 
     # 保存更新后的 Excel 索引表
     df.to_excel(output_file, index=False)
@@ -1,10 +1,10 @@
 import os
 import json
+import random
 import pandas as pd
-import time
-import concurrent.futures
+import asyncio
 from tqdm import tqdm
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
 # --- 加载配置 ---
@@ -15,8 +15,8 @@ if not api_key:
     raise ValueError("错误：未在 .env 文件或环境变量中找到 DEEPSEEK_API_KEY")
 
 # --- 配置区 ---
-# --- 修改：初始化 OpenAI 客户端并指向 DeepSeek Base URL ---
-client = OpenAI(
+# --- 修改：初始化异步 OpenAI 客户端并指向 DeepSeek Base URL ---
+client = AsyncOpenAI(
     api_key=api_key, 
     base_url="https://api.deepseek.com"
 )
@@ -26,11 +26,13 @@ MODEL_ID = "deepseek-chat" # --- 修改：使用 deepseek-chat 模型 ---
 
 INPUT_INDEX_FILE = "output/IJRR_Indexed_Main.xlsx"
 OUTPUT_ANALYSIS_FILE = "output/Literature_Review_Results.xlsx"
-ABSTRACT_DIR = "output/abstracts/"
+ABSTRACT_DIR = "output/abstracts_scripts/"  # step2 的摘要目录，与流水线的 output/abstracts/ 分开
+LEGACY_ABSTRACT_DIR = "output/abstracts/"  # 旧版单篇 JSON 文件所在目录
 
 # --- 并行配置 ---
-MAX_WORKERS = 5  # 并发线程数。建议设为 5-10，过高可能会频繁触发 429 错误
-BATCH_SIZE = 5   # 每次发给 AI 的论文数量
+MAX_WORKERS = 5  # 同时在途的请求数。建议设为 5-10，过高可能会频繁触发 429 错误
+BATCH_SIZE = 25  # 每次发给 AI 的论文数量上限，摘要约 150-300 token，25 篇远低于上下文上限
+MAX_BATCH_TOKENS = 8000  # 单批估算输入 token 上限 (按 4 字符≈1 token)，超出则提前切批
 
 SYSTEM_PROMPT = """
 你是一个非结构化环境（Unstructured Environments）自动驾驶与机器人导航领域的资深审稿人。
@@ -48,26 +50,64 @@ SYSTEM_PROMPT = """
 2. 数组中包含的对象字段：{"id": 原始序号, "score": 整数, "reason": "20字以内中文要点"}
 """
 
+ABSTRACT_TABLE = os.path.join(ABSTRACT_DIR, "abstracts.parquet")  # step2 写出的摘要表
+ABSTRACTS = {}  # {Abstract_Link: 摘要文本}，由 preload_abstracts 一次性填充
+
+def preload_abstracts(links):
+    """启动时一次性读入摘要表，之后按 Abstract_Link 查字典"""
+    ABSTRACTS.clear()
+    if os.path.exists(ABSTRACT_TABLE):
+        table = pd.read_parquet(ABSTRACT_TABLE, columns=['key', 'abstract'])
+        ABSTRACTS.update(zip(table['key'], table['abstract'].fillna("摘要内容为空。")))
+
+    # 兼容旧版索引表：Abstract_Link 为单篇 JSON 文件名
+    legacy = {link for link in links if link.endswith('.json') and link not in ABSTRACTS}
+    if not legacy or not os.path.isdir(LEGACY_ABSTRACT_DIR):
+        return
+    with os.scandir(LEGACY_ABSTRACT_DIR) as it:
+        existing = {entry.name for entry in it if entry.is_file()}
+    for link in legacy & existing:
+        try:
+            with open(os.path.join(LEGACY_ABSTRACT_DIR, link), 'rb') as f:
+                ABSTRACTS[link] = json.loads(f.read()).get('abstract', "摘要内容为空。")
+        except:
+            ABSTRACTS[link] = "摘要文件损坏。"
+
 def get_abstract_content(link):
-    """从本地 JSON 读取摘要内容"""
+    """从预加载的字典读取摘要内容"""
     if pd.isna(link) or link == "Not_Found":
         return "无摘要数据。"
-    path = os.path.join(ABSTRACT_DIR, link)
-    if os.path.exists(path):
+    return ABSTRACTS.get(link, "找不到摘要文件。")
+
+def parse_ai_json(raw_text):
+    """模型通常直接返回 JSON，先整体解析；失败时再剥掉 Markdown 代码块标记重试"""
+    try:
+        return json.loads(raw_text)
+    except json.JSONDecodeError:
+        text = raw_text.strip()
+        if text.startswith("```"):
+            text = text.split("```", 2)[1]
+            if text.startswith("json"):
+                text = text[4:]
+        return json.loads(text.strip("` \n"))
+
+def backoff_delay(attempt, exc=None, base=2.0, cap=30.0):
+    """429 退避时长：优先服从 Retry-After，否则指数退避并乘以随机抖动，避免并发批次同时重试"""
+    response = getattr(exc, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('abstract', "摘要内容为空。")
-        except:
-            return "摘要文件损坏。"
-    return "找不到摘要文件。"
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(cap, base * (2 ** attempt)) * random.uniform(0.5, 1.5)
 
-def call_ai_api(prompt):
+async def call_ai_api(prompt):
     """单纯的 API 调用函数，包含重试逻辑"""
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model=MODEL_ID,
                 messages=[
                     {"role": "system", "content": SYSTEM_PROMPT},
@@ -77,22 +117,20 @@ def call_ai_api(prompt):
                 stream=False,
                 timeout=60 # 设置超时防止卡死
             )
-            raw_text = response.choices[0].message.content.strip()
-            cleaned_text = raw_text.replace("```json", "").replace("```", "").strip()
-            return json.loads(cleaned_text)
+            return parse_ai_json(response.choices[0].message.content)
         except Exception as e:
             if "429" in str(e) or "rate limit" in str(e).lower():
                 if attempt < max_retries - 1:
-                    time.sleep(5 * (attempt + 1)) # 递增等待：5s, 10s...
+                    await asyncio.sleep(backoff_delay(attempt, e)) # 约 2s, 4s... 带随机抖动
                     continue
             # 其他错误或重试耗尽
             print(f"\n[Error] API 调用失败: {e}")
             return None
     return None
 
-def process_batch_task(batch_df_slice):
+async def process_batch_task(sem, batch_df_slice):
     """
-    线程工作函数：处理一个批次的数据
+    协程工作函数：处理一个批次的数据，由信号量限制并发
     输入: DataFrame 切片
     输出: 包含 (index, score, reason) 的结果列表
     """
@@ -102,24 +140,33 @@ def process_batch_task(batch_df_slice):
     
     user_prompt = "请分析以下文献摘要，并返回 JSON 数组：\n\n"
     
-    for i, (idx, row) in enumerate(batch_df_slice.iterrows()):
-        abstract = get_abstract_content(row['Abstract_Link'])
-        user_prompt += f"[文献 {i+1}]\n标题: {row['Title']}\n摘要: {abstract}\n\n"
+    # 只取用到的两列，itertuples 返回普通元组，避免 iterrows 逐行构造 Series
+    rows = batch_df_slice[['Title', 'Abstract_Link']].itertuples(index=True, name=None)
+    for i, (idx, title, link) in enumerate(rows):
+        abstract = get_abstract_content(link)
+        user_prompt += f"[文献 {i+1}]\n标题: {title}\n摘要: {abstract}\n\n"
         indices.append(idx)
 
     # 2. 调用 AI
-    ai_results = call_ai_api(user_prompt)
+    async with sem:
+        ai_results = await call_ai_api(user_prompt)
 
     # 3. 整理结果
     processed_results = []
     
     if ai_results and isinstance(ai_results, list):
+        # 按 id (即 [文献 i] 的序号，从 1 开始) 对齐，模型漏项或乱序时不会错位
+        by_id = {}
+        for item in ai_results:
+            if isinstance(item, dict) and str(item.get('id', '')).strip().isdigit():
+                by_id.setdefault(int(item['id']), item)
         for j, idx in enumerate(indices):
-            if j < len(ai_results):
+            item = by_id.get(j + 1)
+            if item is not None:
                 processed_results.append({
                     "index": idx,
-                    "score": ai_results[j].get('score', 0),
-                    "reason": ai_results[j].get('reason', "无理由")
+                    "score": item.get('score', 0),
+                    "reason": item.get('reason', "无理由")
                 })
             else:
                 processed_results.append({"index": idx, "score": 0, "reason": "AI返回数量不足"})
@@ -130,44 +177,65 @@ def process_batch_task(batch_df_slice):
 
     return processed_results
 
+async def _run_batches(chunks, results_map):
+    """在单个事件循环里并发跑完所有批次，结果写入 results_map"""
+    sem = asyncio.Semaphore(MAX_WORKERS)
+    tasks = [asyncio.ensure_future(process_batch_task(sem, chunk)) for chunk in chunks]
+
+    # 使用 tqdm 显示进度
+    for future in tqdm(asyncio.as_completed(tasks), total=len(chunks), desc="AI 评审进度"):
+        try:
+            batch_results = await future
+            # 将结果存入字典
+            for res in batch_results:
+                results_map[res['index']] = {
+                    'score': res['score'],
+                    'reason': res['reason']
+                }
+        except Exception as e:
+            print(f"批次处理发生异常: {e}")
+
+def split_batches(df):
+    """按 BATCH_SIZE 切分，同时保证单批估算 token 数不超过 MAX_BATCH_TOKENS"""
+    chunks = []
+    start, tokens = 0, 0
+    for pos, (title, link) in enumerate(zip(df['Title'].tolist(), df['Abstract_Link'].tolist())):
+        cost = (len(str(title)) + len(get_abstract_content(link))) // 4
+        if pos > start and (pos - start >= BATCH_SIZE or tokens + cost > MAX_BATCH_TOKENS):
+            chunks.append(df.iloc[start:pos])
+            start, tokens = pos, 0
+        tokens += cost
+    if start < len(df):
+        chunks.append(df.iloc[start:])
+    return chunks
+
 def run_analysis_parallel():
     # 1. 读取数据
     print("正在读取索引文件...")
-    df = pd.read_excel(INPUT_INDEX_FILE)
+    df = pd.read_excel(INPUT_INDEX_FILE, engine="calamine")  # Rust 实现的解析器，比 openpyxl 快得多
+    preload_abstracts(df['Abstract_Link'].dropna().astype(str))
     
     # 2. 切分批次
-    # 将 DataFrame 切分成多个小的 DataFrame，每块包含 BATCH_SIZE 行
-    chunks = [df.iloc[i:i + BATCH_SIZE] for i in range(0, len(df), BATCH_SIZE)]
+    # 将 DataFrame 切分成多个小的 DataFrame，每块最多 BATCH_SIZE 行且不超过 token 预算
+    chunks = split_batches(df)
     
     results_map = {} # 用于存储结果：{index: {'score': x, 'reason': y}}
 
     print(f"开始并行处理，共 {len(chunks)} 个批次，并发数: {MAX_WORKERS}")
 
-    # 3. 并行执行
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # 提交所有任务
-        futures = {executor.submit(process_batch_task, chunk): chunk for chunk in chunks}
-        
-        # 使用 tqdm 显示进度
-        for future in tqdm(concurrent.futures.as_completed(futures), total=len(chunks), desc="AI 评审进度"):
-            try:
-                batch_results = future.result()
-                # 将结果存入字典
-                for res in batch_results:
-                    results_map[res['index']] = {
-                        'score': res['score'],
-                        'reason': res['reason']
-                    }
-            except Exception as e:
-                print(f"批次处理发生异常: {e}")
-
-    # 4. 汇总数据 (线程安全地写回)
+    # 3. 并发执行
+    asyncio.run(_run_batches(chunks, results_map))
+
+    # 4. 汇总数据
     print("正在汇总数据...")
     
-    # 利用 map 函数根据 index 快速填入数据
+    # 先由结果字典构造 Series，再按 df.index 一次性 reindex 对齐
     # 如果某个 index 缺失（理论上不应该），给默认值
-    df['AI_Score'] = df.index.map(lambda x: results_map.get(x, {}).get('score', 0))
-    df['AI_Reason'] = df.index.map(lambda x: results_map.get(x, {}).get('reason', "处理遗漏"))
+    scores = pd.Series({i: r['score'] for i, r in results_map.items()}, dtype=object)
+    reasons = pd.Series({i: r['reason'] for i, r in results_map.items()}, dtype=object)
+    # 分数只有 0-5，压成 int8；模型偶尔返回的非数字分数按 0 处理
+    df['AI_Score'] = pd.to_numeric(scores.reindex(df.index, fill_value=0), errors='coerce').fillna(0).astype('int8')
+    df['AI_Reason'] = reasons.reindex(df.index, fill_value="处理遗漏")
 
     # 5. 排序与保存
     df = df.sort_values(by='AI_Score', ascending=False)
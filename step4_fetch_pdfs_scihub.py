@@ -5,32 +5,64 @@ step4_fetch_pdfs_selenium.py
 """
 
 import os
+import json
 
 import time
 import re
+import queue
+import asyncio
+import tempfile
+import threading
+import httpx
+import requests
 import pandas as pd
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
 from selenium import webdriver
 from selenium.webdriver.edge.service import Service
 from selenium.webdriver.edge.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.microsoft import EdgeChromiumDriverManager
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
 
 # ================= 配置区域 =================
 INPUT_EXCEL = "output/Literature_Review_Results.xlsx" # 您的分析结果文件
 OUTPUT_PDF_DIR = os.path.abspath("output/pdf")        # 必须是绝对路径
 MIN_AI_SCORE = 4                                      # 下载评分阈值
+NUM_BROWSERS = 3                                      # 同时工作的 Edge 实例数 (每个都需要登录一次)
+REDIRECT_MAX_WAIT_TIME = 10                           # 等待 DOI 跳转完成的最长秒数
+BROWSER_DOWNLOAD_MAX_WAIT_TIME = 15                   # 等待单篇 PDF 下载完成的最长秒数
+RECYCLE_AFTER = 0                                     # 单个实例处理多少篇后重启以回收内存，0 表示不重启
+PROFILE_DIR = os.path.abspath("output/edge_profile")  # 持久化的浏览器用户数据目录，登录状态跨运行保留
+ALWAYS_PROMPT_LOGIN = False                           # 为 True 时即使已有保存的登录状态也暂停等待手动登录
 # ===========================================
 
+_NONWORD_RE = re.compile(r"[^\w\s-]")
+_SPACE_RE = re.compile(r"[-\s]+")
+_IEEE_ARNUMBER_RE = re.compile(r"document/(\d+)")
+# 纯 ASCII 标题 (绝大多数) 用 str.translate 一次删掉所有标点，比正则逐字符匹配快
+_ASCII_STRIP_TABLE = str.maketrans("", "", "".join(chr(c) for c in range(128) if _NONWORD_RE.match(chr(c))))
+
 def slugify(value: str) -> str:
     """文件名合法化"""
     if not isinstance(value, str): return "untitled"
-    value = re.sub(r"[^\w\s-]", "", value).strip().lower()
-    return re.sub(r"[-\s]+", "_", value)
+    if value.isascii():
+        value = value.translate(_ASCII_STRIP_TABLE)
+    else:
+        value = _NONWORD_RE.sub("", value)
+    return _SPACE_RE.sub("_", value.strip().lower())
 
-def init_driver(download_dir):
-    """初始化 Edge 驱动，配置自动下载 PDF 而非预览"""
+def init_driver(download_dir, profile_dir=None):
+    """初始化 Edge 驱动，配置自动下载 PDF 而非预览；指定 profile_dir 时复用其中的 Cookie/登录状态"""
     edge_options = Options()
+    if profile_dir:
+        edge_options.add_argument(f"--user-data-dir={profile_dir}")
+        edge_options.add_argument("--profile-directory=Default")
     
     # 关键配置：设置下载路径，并禁止 PDF 内置预览（强制下载）
     prefs = {
@@ -59,56 +91,136 @@ def init_driver(download_dir):
             raise FileNotFoundError(f"驱动下载失败且本地未找到 msedgedriver.exe。请手动下载放入脚本目录。\n错误信息: {e}")
     
     # 启动浏览器
-    driver = webdriver.Edge(service=service, options=edge_options)
+    # 每个实例有自己独立的 WebDriver 连接池，且 BrowserPool 保证同一时刻只有一个线程操作它，
+    # 因此无需调大连接池 maxsize；显式开启 keep-alive，复用到本地驱动的 HTTP 连接
+    driver = webdriver.Edge(service=service, options=edge_options, keep_alive=True)
     return driver
 
-def wait_for_download(save_dir, expected_filename, timeout=30):
+DOWNLOAD_TMP_NAME = ".downloading"  # OUTPUT_PDF_DIR 下存放各实例临时下载目录的子目录
+PARTIAL_SUFFIXES = (".crdownload", ".tmp", ".partial")  # 浏览器下载中的临时文件后缀
+
+class _DirChangeHandler(FileSystemEventHandler):
+    """目录里出现或改名出 .pdf 时置位事件，唤醒等待下载的线程"""
+
+    def __init__(self):
+        self.changed = threading.Event()
+
+    def on_any_event(self, event):
+        path = getattr(event, "dest_path", "") or event.src_path
+        if str(path).endswith(".pdf"):
+            self.changed.set()
+
+# 全局只起一个 Observer，每个下载目录首次等待时挂上监听
+_observer = None
+_dir_handlers = {}  # {目录: (handler, watch)}
+_watch_lock = threading.Lock()
+
+def _watch_dir(save_dir):
+    """返回 save_dir 对应的变更事件，必要时启动 Observer 并注册监听"""
+    global _observer
+    with _watch_lock:
+        if _observer is None:
+            _observer = Observer()
+            _observer.daemon = True
+            _observer.start()
+        if save_dir not in _dir_handlers:
+            handler = _DirChangeHandler()
+            _dir_handlers[save_dir] = (handler, _observer.schedule(handler, save_dir, recursive=False))
+        return _dir_handlers[save_dir][0].changed
+
+def _unwatch_dir(save_dir):
+    """目录用完后撤掉监听，避免每篇论文一个目录时监听越积越多"""
+    with _watch_lock:
+        entry = _dir_handlers.pop(save_dir, None)
+        if entry is not None:
+            try:
+                _observer.unschedule(entry[1])
+            except Exception:
+                pass
+
+def wait_for_download(save_dir, expected_filename, timeout=30, dest_dir=None, before=None):
     """
     等待文件下载完成，并重命名为目标文件名
     Selenium 下载的文件名通常是原始文件名（如 09746358.pdf），我们需要把它改成标题名
+    dest_dir 不为空时，把文件从浏览器自己的下载目录移动到 dest_dir
+    before 为触发下载前目录里已有的文件名集合，只有之后新出现的文件才会被认领
     """
-    # 记录下载前的文件夹状态
-    # 这种方法比较简单粗暴：轮询文件夹里最新的 .pdf 文件
+    dest_path = os.path.join(dest_dir or save_dir, expected_filename)
+    # 记录下载前的文件夹状态 (调用方最好在触发下载前就拍快照，以免漏掉下载极快的文件)
+    if before is None:
+        before = set(os.listdir(save_dir))
+    changed = _watch_dir(save_dir)
     end_time = time.time() + timeout
     
     while time.time() < end_time:
-        # 查找目录下最新的 pdf 文件（忽略已命名的文件，假设下载的是随机名或ID名）
-        files = [os.path.join(save_dir, f) for f in os.listdir(save_dir) if f.endswith(".pdf")]
-        if not files:
-            time.sleep(1)
-            continue
-            
-        # 找到修改时间最新的文件
-        latest_file = max(files, key=os.path.getmtime)
-        
-        # 检查是否还在下载 (.crdownload 或 .tmp) - 这里只列出了 pdf，所以要检查文件是否被占用或大小稳定
-        # 简单判定：如果是最近 5 秒内生成的，且不是我们已经重命名过的文件
-        if os.path.basename(latest_file) == expected_filename:
-            return True # 已经是目标文件了
-            
-        # 尝试重命名
-        try:
-            os.rename(latest_file, os.path.join(save_dir, expected_filename))
-            return True
-        except OSError:
-            # 文件占用中（下载未完成），继续等待
-            time.sleep(1)
+        # 先清除事件再检查目录，检查之后发生的变化一定会把事件重新置位
+        changed.clear()
+        # 只看快照之后新出现的文件，不再对整个目录逐个 stat
+        new_files = [f for f in os.listdir(save_dir) if f not in before]
+        # 还有 .crdownload 等临时文件说明下载未完成
+        pdfs = [f for f in new_files if f.endswith(".pdf")]
+        if pdfs and not any(f.endswith(PARTIAL_SUFFIXES) for f in new_files):
+            # 尝试重命名
+            try:
+                # 临时目录与目标目录在同一文件系统上，os.replace 为原子操作
+                os.replace(os.path.join(save_dir, pdfs[0]), dest_path)
+                return True
+            except OSError:
+                # 文件占用中（下载未完成），继续等待
+                pass
+        # 等待文件系统事件唤醒；最多 1 秒兜底重查，防止个别文件系统漏报事件
+        changed.wait(min(1.0, max(0.0, end_time - time.time())))
             
     return False
 
-def process_ieee(driver, doi, target_filename):
-    """专门处理 IEEE 的逻辑"""
+ARNUMBER_CACHE_FILE = "arnumber_cache.json"  # DOI → IEEE arnumber 的磁盘缓存，位于 OUTPUT_PDF_DIR 下
+_arnumber_cache = {}
+_arnumber_lock = threading.Lock()
+
+def load_arnumber_cache(path):
+    """启动时读入 DOI → arnumber 缓存"""
+    _arnumber_cache.clear()
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            _arnumber_cache.update(json.loads(f.read()))
+
+def save_arnumber_cache(path):
+    """先写临时文件再替换，避免中途退出写坏缓存"""
+    with _arnumber_lock:
+        data = dict(_arnumber_cache)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+def resolve_arnumber(driver, doi):
+    """DOI → IEEE arnumber：先查缓存，未命中才访问 doi.org 等待跳转并从 URL 中提取"""
+    with _arnumber_lock:
+        if doi in _arnumber_cache:
+            return _arnumber_cache[doi]
+
     # 1. 访问 DOI 跳转
     driver.get(f"https://doi.org/{doi}")
-    time.sleep(3) # 等待跳转
-    
-    current_url = driver.current_url
+    # 等待跳转离开 doi.org，条件满足立即返回，而不是固定睡 3 秒
+    try:
+        WebDriverWait(driver, REDIRECT_MAX_WAIT_TIME, poll_frequency=0.2).until(
+            lambda d: "doi.org" not in d.current_url
+        )
+    except TimeoutException:
+        pass
     
     # 2. 提取 arnumber (IEEE 文章 ID)
     # URL 格式通常是: https://ieeexplore.ieee.org/document/9746006/
-    match = re.search(r"document/(\d+)", current_url)
-    if match:
-        arnumber = match.group(1)
+    match = _IEEE_ARNUMBER_RE.search(driver.current_url)
+    if not match:
+        return None
+    with _arnumber_lock:
+        _arnumber_cache[doi] = match.group(1)
+    return match.group(1)
+
+def process_ieee(driver, doi, target_filename):
+    """专门处理 IEEE 的逻辑"""
+    arnumber = resolve_arnumber(driver, doi)
+    if arnumber:
         # 3. 构造直接下载链接
         download_url = f"https://ieeexplore.ieee.org/stamp/stamp.jsp?tp=&arnumber={arnumber}"
         print(f"  -> 识别为 IEEE, 尝试直接下载: {arnumber}")
@@ -116,11 +228,255 @@ def process_ieee(driver, doi, target_filename):
         return True
     return False
 
+IEEE_HTTP_WORKERS = 4  # 用 Cookie 直接下载 IEEE PDF 的并发线程数
+
+def session_from_browser(pool):
+    """借用一个已登录的浏览器实例，把其 IEEE Xplore 的 Cookie 与 User-Agent 复制到 requests.Session"""
+    slot = pool.acquire()
+    try:
+        driver = slot[0]
+        driver.get("https://ieeexplore.ieee.org/")
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=IEEE_HTTP_WORKERS, pool_maxsize=IEEE_HTTP_WORKERS))
+        session.headers["User-Agent"] = driver.execute_script("return navigator.userAgent")
+        for cookie in driver.get_cookies():
+            session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+        return session
+    finally:
+        pool.release(slot)
+
+def download_ieee_http(session, doi, safe_name):
+    """
+    不经浏览器直接下载 IEEE PDF：arnumber 优先取缓存，否则跟随 doi.org 跳转解析；
+    响应不是 PDF (通常是未登录的跳转页) 时返回 False，交给浏览器重试
+    """
+    dest_path = os.path.join(OUTPUT_PDF_DIR, safe_name)
+    tmp_path = dest_path + ".part"
+    try:
+        with _arnumber_lock:
+            arnumber = _arnumber_cache.get(doi)
+        if not arnumber:
+            with session.get(f"https://doi.org/{doi}", timeout=30, stream=True) as res:
+                match = _IEEE_ARNUMBER_RE.search(res.url)
+            if not match:
+                return False
+            arnumber = match.group(1)
+            with _arnumber_lock:
+                _arnumber_cache[doi] = arnumber
+
+        # stamp.jsp 只是套着 iframe 的页面，真正的 PDF 地址是 stampPDF/getPDF.jsp
+        pdf_url = f"https://ieeexplore.ieee.org/stampPDF/getPDF.jsp?tp=&arnumber={arnumber}&ref="
+        with session.get(pdf_url, timeout=60, stream=True) as res:
+            if res.status_code != 200:
+                return False
+            chunks = res.iter_content(chunk_size=64 * 1024)
+            # 先攒够文件头再判断是否为 PDF，分块边界可能落在文件头中间
+            head = b""
+            for chunk in chunks:
+                head += chunk
+                if len(head) >= 5:
+                    break
+            if not head.startswith(b"%PDF-"):
+                return False
+            with open(tmp_path, 'wb') as f:
+                f.write(head)
+                for chunk in chunks:
+                    f.write(chunk)
+        os.replace(tmp_path, dest_path)
+        return True
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+# DOI 前缀 → 下载处理函数；值为 None 表示该出版社需要登录后手动点击，自动访问 DOI 只会白等超时，直接跳过
+# 不在表中的前缀仍按通用方式访问 DOI 碰运气
+PUBLISHER_HANDLERS = {
+    "10.1109": process_ieee,  # IEEE
+    "10.1016": None,          # Elsevier
+    "10.1007": None,          # Springer
+    "10.1002": None,          # Wiley
+    "10.1177": None,          # SAGE (IJRR)
+    "10.1080": None,          # Taylor & Francis
+}
+MANUAL_LIST_FILE = "needs_manual.csv"  # 被跳过、需要手动下载的论文清单，写在 OUTPUT_PDF_DIR 下
+
+def clear_dir(path, keep=()):
+    """删除目录下除 keep 之外的文件；浏览器仍占用的文件删不掉就留到下次"""
+    for name in os.listdir(path):
+        if name not in keep:
+            try:
+                os.remove(os.path.join(path, name))
+            except OSError:
+                pass
+
+def discard_dir(path):
+    """尽量删除整个目录；浏览器仍占用的半截文件删不掉时目录留在原处，但不会再被使用"""
+    _unwatch_dir(path)
+    for name in os.listdir(path):
+        sub = os.path.join(path, name)
+        if os.path.isdir(sub):
+            discard_dir(sub)
+    clear_dir(path)
+    try:
+        os.rmdir(path)
+    except OSError:
+        pass
+
+def new_attempt_dir(driver, worker_dir):
+    """
+    每次下载尝试新建一个空目录并让浏览器改为下载到这里
+    超时后浏览器可能仍在写上一篇的 .crdownload，换目录后它改名出的 PDF 不会被下一篇认领
+    """
+    attempt_dir = tempfile.mkdtemp(prefix="attempt_", dir=worker_dir)
+    driver.execute_cdp_cmd("Browser.setDownloadBehavior", {"behavior": "allow", "downloadPath": attempt_dir})
+    return attempt_dir
+
+class BrowserPool:
+    """
+    预先启动的多个 Edge 实例，每个实例使用独立的下载目录 (每篇论文再各用一个子目录)，避免互相抢文件
+    工作线程 acquire() 取出一个实例，用完 release() 放回
+    """
+
+    def __init__(self, size, base_dir, recycle_after=0, profile_root=None):
+        self.recycle_after = recycle_after
+        self.fresh_profiles = 0  # 本次新建 (尚未登录过) 的用户数据目录数
+        self._idle = queue.Queue()
+        for k in range(size):
+            download_dir = os.path.join(base_dir, f"worker_{k}")
+            os.makedirs(download_dir, exist_ok=True)
+            # 清掉上次运行中断遗留的文件和尝试目录
+            for name in os.listdir(download_dir):
+                if os.path.isdir(os.path.join(download_dir, name)):
+                    discard_dir(os.path.join(download_dir, name))
+            clear_dir(download_dir)
+            # 同一用户数据目录不能被两个浏览器同时占用，每个实例各用一个
+            profile_dir = os.path.join(profile_root, f"browser_{k}") if profile_root else None
+            if profile_dir and not os.path.isdir(profile_dir):
+                self.fresh_profiles += 1
+            self._idle.put([init_driver(download_dir, profile_dir), download_dir, 0, profile_dir])
+
+    def acquire(self):
+        return self._idle.get()
+
+    def release(self, slot):
+        slot[2] += 1
+        if self.recycle_after and slot[2] >= self.recycle_after:
+            # 重启实例回收内存；沿用同一用户数据目录，登录状态不丢失
+            slot[0].quit()
+            slot[0], slot[2] = init_driver(slot[1], slot[3]), 0
+        self._idle.put(slot)
+
+def download_one(pool, doi, safe_name, is_ieee):
+    """工作线程：借用一个浏览器实例下载单篇论文，成功返回 True"""
+    slot = pool.acquire()
+    driver = slot[0]
+    download_dir = None
+    try:
+        # 每篇论文一个全新的空目录，之后出现在里面的文件只可能属于本篇
+        download_dir = new_attempt_dir(driver, slot[1])
+        before = set()
+
+        # 按出版社分派：Venue 标明 IEEE 的也走 IEEE 逻辑
+        handler = process_ieee if is_ieee else PUBLISHER_HANDLERS.get(doi.split("/", 1)[0])
+        if handler:
+            is_triggered = handler(driver, doi, safe_name)
+        else:
+            # 非 IEEE，简单尝试访问 DOI (如果有些数据库点击直接下载)
+            driver.get(f"https://doi.org/{doi}")
+            is_triggered = True # 假定触发了，依靠后面 wait_for_download 验证
+
+        # 等待下载，并从该实例的下载目录移动到 OUTPUT_PDF_DIR (下载完成即返回，不再额外休息)
+        return bool(is_triggered and wait_for_download(
+            download_dir, safe_name, timeout=BROWSER_DOWNLOAD_MAX_WAIT_TIME, dest_dir=OUTPUT_PDF_DIR, before=before
+        ))
+    except Exception as e:
+        print(f"  [Error] {e}")
+        return False
+    finally:
+        # 本次目录不再复用；超时时浏览器仍占着的半截文件删不掉也无妨
+        if download_dir is not None:
+            discard_dir(download_dir)
+        pool.release(slot)
+
+INPUT_COLUMNS = ['Title', 'DOI', 'Venue', 'AI_Score']  # 下载只需要这几列
+
+def load_input(path):
+    """只读取需要的列；输入为 Parquet 时按列读取，Excel 则用 calamine 引擎解析"""
+    if path.endswith(".parquet"):
+        present = [c for c in INPUT_COLUMNS if c in pq.read_schema(path).names]
+        return pd.read_parquet(path, columns=present)
+    return pd.read_excel(path, engine="calamine", usecols=lambda c: c in INPUT_COLUMNS)
+
+CROSSREF_API = "https://api.crossref.org/works"
+CROSSREF_BATCH = 50     # 单次 filter 查询的 DOI 数，过多会让 URL 过长
+DIRECT_CONCURRENCY = 8  # 直链下载与 CrossRef 查询的并发数
+
+async def _crossref_pdf_links(client, sem, dois):
+    """一次 CrossRef 查询解析一批 DOI，返回 {小写 DOI: PDF 链接}"""
+    params = {'filter': ",".join(f"doi:{d}" for d in dois), 'rows': len(dois), 'select': 'DOI,link'}
+    async with sem:
+        try:
+            res = await client.get(CROSSREF_API, params=params, timeout=30)
+            res.raise_for_status()
+            items = res.json().get('message', {}).get('items', [])
+        except Exception as e:
+            print(f"  [CrossRef] 查询失败: {e}")
+            return {}
+    links = {}
+    for item in items:
+        for link in item.get('link', []):
+            if link.get('content-type') == 'application/pdf' and link.get('URL'):
+                links[item['DOI'].lower()] = link['URL']
+                break
+    return links
+
+async def _download_pdf(client, sem, url, dest_path):
+    """流式下载 PDF 到临时文件，确认是 PDF 后原子移动到目标路径"""
+    tmp_path = dest_path + ".part"
+    async with sem:
+        try:
+            async with client.stream('GET', url, follow_redirects=True, timeout=60) as res:
+                if res.status_code != 200:
+                    return False
+                with open(tmp_path, 'wb') as f:
+                    async for chunk in res.aiter_bytes():
+                        f.write(chunk)
+            # 不少出版社的 "PDF" 链接其实返回登录页，检查文件头
+            with open(tmp_path, 'rb') as f:
+                if f.read(5) != b"%PDF-":
+                    os.remove(tmp_path)
+                    return False
+            os.replace(tmp_path, dest_path)
+            return True
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+async def fetch_direct_pdfs(papers):
+    """
+    papers 为 [(doi, safe_name), ...]：先按 CROSSREF_BATCH 个一批查询 CrossRef，
+    再并发下载拿到直链的 PDF；返回成功下载的 safe_name 集合
+    """
+    sem = asyncio.Semaphore(DIRECT_CONCURRENCY)
+    async with httpx.AsyncClient(headers={"User-Agent": "get_pappers/1.0"}) as client:
+        batches = [papers[i:i + CROSSREF_BATCH] for i in range(0, len(papers), CROSSREF_BATCH)]
+        links = {}
+        for found in await asyncio.gather(*[_crossref_pdf_links(client, sem, [d for d, _ in b]) for b in batches]):
+            links.update(found)
+
+        targets = [(name, links[doi.lower()]) for doi, name in papers if doi.lower() in links]
+        results = await asyncio.gather(*[
+            _download_pdf(client, sem, url, os.path.join(OUTPUT_PDF_DIR, name)) for name, url in targets
+        ])
+    return {name for (name, _), ok in zip(targets, results) if ok}
+
 def main():
     # 1. 准备数据
     if not os.path.exists(INPUT_EXCEL):
         # 尝试寻找
-        files = [f for f in os.listdir("output") if "analysis" in f and f.endswith(".xlsx")]
+        files = [f for f in os.listdir("output") if "analysis" in f and f.endswith((".xlsx", ".parquet"))]
         if files:
             input_path = os.path.join("output", files[0])
         else:
@@ -132,7 +488,7 @@ def main():
     if not os.path.exists(OUTPUT_PDF_DIR):
         os.makedirs(OUTPUT_PDF_DIR)
 
-    df = pd.read_excel(input_path)
+    df = load_input(input_path)
     if 'AI_Score' in df.columns:
         df['AI_Score'] = pd.to_numeric(df['AI_Score'], errors='coerce').fillna(0)
         target_df = df[df['AI_Score'] >= MIN_AI_SCORE]
@@ -141,60 +497,84 @@ def main():
         
     print(f"待下载文献数: {len(target_df)}")
 
-    # 2. 启动浏览器
-    print("\n正在启动 Edge 浏览器...")
-    driver = init_driver(OUTPUT_PDF_DIR)
-    
-    # 3. *** 关键交互步骤 ***
-    print("\n" + "="*60)
-    print("【请注意】浏览器已打开！")
-    print("请在弹出的 Edge 窗口中，手动打开一个新标签页，登录您的学校认证系统/图书馆入口。")
-    print("确保您能正常访问 IEEE Xplore 并下载任意一篇论文的 PDF。")
-    print("登录完成后，请回到这里按下 [Enter/回车] 键开始自动下载。")
-    print("="*60 + "\n")
-    input("登录完成后，请按回车键继续...")
-
-    # 4. 开始批量下载
-    success_count = 0
+    # 2. 向量化筛选需要下载的论文：去掉无 DOI 的行，一次性算出文件名与是否 IEEE
+    empty = pd.Series('', index=target_df.index)
+    doi = target_df.get('DOI', empty)
+    has_doi = doi.notna() & doi.astype(str).str.len().gt(0)
+    todo = target_df[has_doi]
+    doi = doi[has_doi].astype(str)
+    safe_names = todo.get('Title', empty[has_doi]).str.slice(0, 80).map(slugify) + ".pdf"
+    venue = todo.get('Venue', empty[has_doi]).fillna('').astype(str)
+    is_ieee = doi.str.contains("10.1109", regex=False) | venue.str.contains("IEEE", regex=False)
+
+    # 同名文件只下载一次，避免并发时互相覆盖；已存在的跳过 (一次 scandir 取全部文件名，不再逐行 stat)
+    with os.scandir(OUTPUT_PDF_DIR) as it:
+        done = {entry.name for entry in it if entry.is_file()}
+    tasks = pd.DataFrame({
+        'title': todo.get('Title', empty[has_doi]), 'doi': doi, 'safe_name': safe_names, 'is_ieee': is_ieee
+    }).drop_duplicates('safe_name')
+    tasks = tasks[~tasks['safe_name'].isin(done)]
+
+    # 3. 先用 CrossRef 批量查询 PDF 直链，开放获取的论文直接 HTTP 下载，不必打开浏览器
+    direct = asyncio.run(fetch_direct_pdfs(list(zip(tasks['doi'], tasks['safe_name']))))
+    tasks = tasks[~tasks['safe_name'].isin(direct)]
+    print(f"通过 CrossRef 直链下载 {len(direct)} 篇，剩余 {len(tasks)} 篇")
+
+    # 已知无法自动下载的出版社直接跳过，记入清单留待手动处理
+    skip_prefixes = [prefix for prefix, handler in PUBLISHER_HANDLERS.items() if handler is None]
+    manual = tasks['doi'].str.split('/', n=1).str[0].isin(skip_prefixes) & ~tasks['is_ieee']
+    if manual.any():
+        manual_path = os.path.join(OUTPUT_PDF_DIR, MANUAL_LIST_FILE)
+        tasks.loc[manual, ['title', 'doi']].to_csv(manual_path, index=False, encoding='utf-8-sig')
+        print(f"跳过 {int(manual.sum())} 篇需手动下载的论文，清单见: {manual_path}")
+    tasks = tasks.loc[~manual, ['doi', 'safe_name', 'is_ieee']]
+    if tasks.empty:
+        print(f"\n任务结束，共成功下载 {len(direct)} 篇。")
+        return
+
+    # 4. 启动浏览器 (只有需要浏览器的论文才启动)
+    print(f"\n正在启动 {NUM_BROWSERS} 个 Edge 浏览器...")
+    # 每个实例下载到 OUTPUT_PDF_DIR/.downloading/worker_<k>，完成后再移动到 OUTPUT_PDF_DIR
+    download_root = os.path.join(OUTPUT_PDF_DIR, DOWNLOAD_TMP_NAME)
+    pool = BrowserPool(NUM_BROWSERS, download_root, recycle_after=RECYCLE_AFTER, profile_root=PROFILE_DIR)
     
-    for _, row in tqdm(target_df.iterrows(), total=len(target_df), unit="paper"):
-        title = row.get('Title', 'Untitled')
-        doi = row.get('DOI', '')
-        
-        if not doi or pd.isna(doi):
-            continue
-            
-        safe_name = slugify(title[:80]) + ".pdf"
-        save_path = os.path.join(OUTPUT_PDF_DIR, safe_name)
-        
-        if os.path.exists(save_path):
-            continue
+    # 5. *** 关键交互步骤 *** (用户数据目录已保存过登录状态时跳过)
+    if pool.fresh_profiles or ALWAYS_PROMPT_LOGIN:
+        print("\n" + "="*60)
+        print(f"【请注意】已打开 {NUM_BROWSERS} 个浏览器窗口！")
+        print("请在每个弹出的 Edge 窗口中，手动打开一个新标签页，登录您的学校认证系统/图书馆入口。")
+        print("确保您能正常访问 IEEE Xplore 并下载任意一篇论文的 PDF。")
+        print("登录状态会保存在 PROFILE_DIR 中，之后运行无需再次登录。")
+        print("登录完成后，请回到这里按下 [Enter/回车] 键开始自动下载。")
+        print("="*60 + "\n")
+        input("登录完成后，请按回车键继续...")
+    else:
+        print(f"使用已保存的登录状态: {PROFILE_DIR} (如已过期，设 ALWAYS_PROMPT_LOGIN = True 重新登录)")
 
-        # print(f"正在处理: {title[:30]}...")
-        
-        try:
-            # 尝试 IEEE 逻辑
-            if "10.1109" in str(doi) or "IEEE" in str(row.get('Venue', '')):
-                is_triggered = process_ieee(driver, doi, safe_name)
-            else:
-                # 非 IEEE，简单尝试访问 DOI (如果有些数据库点击直接下载)
-                driver.get(f"https://doi.org/{doi}")
-                is_triggered = True # 假定触发了，依靠后面 wait_for_download 验证
-            
-            # 等待下载并重命名
-            # 我们给脚本一点时间去“捕捉”新下载的文件
-            if is_triggered:
-                if wait_for_download(OUTPUT_PDF_DIR, safe_name, timeout=15):
-                    # print(f"  [√] 下载成功")
-                    success_count += 1
-                else:
-                    pass
-                    # print(f"  [x] 下载超时或未找到文件")
-            
-            time.sleep(2) # 稍微休息防止请求过快
-            
-        except Exception as e:
-            print(f"  [Error] {e}")
+    # 重跑时 IEEE 论文可直接用缓存的 arnumber，跳过 DOI 跳转
+    arnumber_cache_path = os.path.join(OUTPUT_PDF_DIR, ARNUMBER_CACHE_FILE)
+    load_arnumber_cache(arnumber_cache_path)
+    try:
+        # 6. IEEE 论文先用浏览器的登录 Cookie 直接 HTTP 下载，不占用浏览器
+        ieee = tasks['is_ieee']
+        session = session_from_browser(pool)
+        with ThreadPoolExecutor(max_workers=IEEE_HTTP_WORKERS) as executor:
+            ieee_ok = list(tqdm(
+                executor.map(lambda task: download_ieee_http(session, task[0], task[1]),
+                             tasks.loc[ieee, ['doi', 'safe_name']].itertuples(index=False)),
+                total=int(ieee.sum()), unit="paper", desc="IEEE 直接下载",
+            ))
+        success_count = len(direct) + sum(ieee_ok)
+        # 直接下载失败的 (如 Cookie 不被接受) 退回浏览器
+        ieee_failed = tasks.loc[ieee].loc[[not ok for ok in ieee_ok]]
+        tasks = pd.concat([tasks.loc[~ieee], ieee_failed])
+
+        # 7. 其余论文由多个浏览器并行下载
+        with ThreadPoolExecutor(max_workers=NUM_BROWSERS) as executor:
+            futures = [executor.submit(download_one, pool, *task) for task in tasks.itertuples(index=False)]
+            success_count += sum(f.result() for f in tqdm(futures, total=len(futures), unit="paper"))
+    finally:
+        save_arnumber_cache(arnumber_cache_path)
 
     print(f"\n任务结束，共成功下载 {success_count} 篇。")
     print("请手动关闭浏览器窗口。")